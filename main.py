@@ -5,6 +5,7 @@
 """
 import os
 import sys
+import argparse
 import tkinter as tk
 from tkinter import ttk
 
@@ -13,6 +14,22 @@ from video_detector import VideoDetectorApp
 
 def main():
     """主程序入口"""
+    # 设置控制台输出编码（只在程序入口设置一次，导入模块时不再修改标准输出）
+    if sys.platform == 'win32':
+        # 子进程通过环境变量继承UTF-8编码
+        os.environ.setdefault('PYTHONIOENCODING', 'utf-8')
+        try:
+            sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+            sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+        except Exception:
+            pass
+    
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description="视频检测与修复工具")
+    parser.add_argument("--no-cache", action="store_true", help="不使用ffprobe元数据缓存")
+    parser.add_argument("--debug", action="store_true", help="出错时在日志中显示完整的异常堆栈")
+    args = parser.parse_args()
+    
     # 创建主窗口
     root = tk.Tk()
     root.title("视频检测与修复工具")
@@ -32,7 +49,7 @@ def main():
         pass
     
     # 初始化应用
-    app = VideoDetectorApp(root)
+    app = VideoDetectorApp(root, use_cache=not args.no_cache, debug=args.debug)
     
     # 启动主循环
     root.mainloop()
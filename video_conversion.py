@@ -2,6 +2,7 @@
 """
 视频转换模块 - 提供与MoviePy兼容的视频转换功能
 """
+import io
 import os
 import subprocess
 import tempfile
@@ -9,24 +10,24 @@ import json
 import time
 import traceback
 from datetime import datetime
-import locale
-import sys
+from pathlib import Path
+from types import MappingProxyType
 import shutil
+import functools
+import platform
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# 设置控制台输出编码
-if sys.platform == 'win32':
-    # Windows平台设置控制台编码为UTF-8
-    try:
-        # 获取当前编码
-        system_encoding = locale.getpreferredencoding()
-        # 设置标准输出和标准错误的编码
-        sys.stdout.reconfigure(encoding='utf-8')
-        sys.stderr.reconfigure(encoding='utf-8')
-    except Exception:
-        pass
+# PyAV为可选依赖，可用时extract_frame在进程内解码，不必每次启动FFmpeg
+try:
+    import av
+except ImportError:
+    av = None
 
 # 常见视频编解码器映射表
-VIDEO_CODEC_MAP = {
+VIDEO_CODEC_MAP = MappingProxyType({
     # H.264
     'h264': 'libx264',
     'avc': 'libx264',
@@ -44,22 +45,234 @@ VIDEO_CODEC_MAP = {
     'mpeg2video': 'mpeg2video',
     'vp8': 'libvpx',
     'theora': 'libtheora',
-}
+})
+
+# 支持FFmpeg通用两遍编码参数（-pass/-passlogfile）的编码器；libx265需通过-x265-params单独传递
+TWO_PASS_CODECS = frozenset({'libx264', 'libvpx', 'libvpx-vp9', 'libaom-av1', 'mpeg4', 'mpeg2video', 'libtheora'})
 
 # 常见音频编解码器映射表
-AUDIO_CODEC_MAP = {
+AUDIO_CODEC_MAP = MappingProxyType({
     'aac': 'aac',
     'mp3': 'libmp3lame',
     'opus': 'libopus',
     'vorbis': 'libvorbis',
     'flac': 'flac',
     'pcm_s16le': 'pcm_s16le',  # WAV
+})
+
+# 可能导致MoviePy不兼容的视频编码
+PROBLEM_VIDEO_CODECS = frozenset({'hevc', 'h265', 'av1', 'vp9'})
+
+# MoviePy兼容的像素格式
+OK_PIXEL_FORMATS = frozenset({'yuv420p', 'yuvj420p', 'rgb24', 'bgr24'})
+
+# MoviePy兼容的色彩空间
+OK_COLOR_SPACES = frozenset({'bt709', 'bt601', 'bt470bg', 'smpte170m'})
+
+# MoviePy兼容的音频编码
+OK_AUDIO_CODECS = frozenset({'aac', 'mp3', 'pcm_s16le'})
+
+# FFmpeg进度日志的最小输出间隔（秒）
+PROGRESS_LOG_INTERVAL = 2.0
+
+# 读取FFmpeg管道输出时每次读取的最大字节数
+PIPE_READ_SIZE = 65536
+
+# 批量转换时每个FFmpeg进程使用的线程数
+BATCH_THREADS_PER_JOB = 4
+
+# 使用硬件编码器批量转换时的最大并发数（消费级显卡的并发编码会话有限）
+HW_ENCODER_MAX_SESSIONS = 2
+
+# 分段并行编码：超过该时长（秒）的视频才分段
+SEGMENT_MIN_DURATION = 300
+
+# 分段并行编码时每个分段FFmpeg进程使用的线程数
+SEGMENT_THREADS_PER_JOB = 2
+
+# 需要把moov atom移到文件头部（+faststart）的容器扩展名
+FASTSTART_EXTENSIONS = frozenset({'.mp4', '.mov', '.m4v'})
+
+# 最多保持打开的PyAV帧提取器数量（每个都占用文件句柄和解码器内存）
+FRAME_EXTRACTOR_CACHE_SIZE = 4
+
+# FFmpeg错误输出中表明硬件解码初始化失败的关键字（小写），只有出现这些错误时才改用软件解码重试
+HWACCEL_ERROR_MARKERS = (
+    b'hwaccel',
+    b'device creation failed',
+    b'failed setup for format',
+    b'no device available',
+    b'hw_frames_ctx',
+    b'hardware device',
+)
+
+# VAAPI默认渲染设备
+VAAPI_DEVICE = '/dev/dri/renderD128'
+
+# 当前操作系统名称（'Windows'、'Linux'、'Darwin'）
+_SYSTEM = platform.system()
+
+# 各平台可用的硬件H.264编码器（按优先级排列）
+HW_ENCODER_CANDIDATES = {
+    'Windows': ['h264_nvenc', 'h264_qsv', 'h264_amf'],
+    'Linux': ['h264_nvenc', 'h264_qsv', 'h264_vaapi'],
+    'Darwin': ['h264_videotoolbox'],
+}
+
+# 硬件H.264编码器对应的HEVC编码器
+HW_HEVC_ENCODER_MAP = {
+    'h264_nvenc': 'hevc_nvenc',
+    'h264_qsv': 'hevc_qsv',
+    'h264_vaapi': 'hevc_vaapi',
+    'h264_videotoolbox': 'hevc_videotoolbox',
+    'h264_amf': 'hevc_amf',
+}
+
+# 硬件编码器需要放在 -i 之前的设备初始化参数
+HW_ENCODER_INPUT_ARGS = {
+    'h264_qsv': ['-init_hw_device', 'qsv=hw', '-filter_hw_device', 'hw'],
+    'h264_vaapi': ['-vaapi_device', VAAPI_DEVICE],
+}
+
+# 硬件编码器需要追加的视频滤镜（将帧上传到显存）
+HW_ENCODER_FILTERS = {
+    'h264_vaapi': 'format=nv12,hwupload',
+}
+
+# 硬件编码器对应的硬件解码方式和显存内缩放滤镜，解码后的帧直接留在显存中交给编码器
+HW_DECODE_MAP = {
+    'h264_nvenc': ('cuda', 'scale_cuda'),
+    'h264_qsv': ('qsv', 'scale_qsv'),
+    'h264_vaapi': ('vaapi', 'scale_vaapi'),
 }
 
+# 质量预设（添加色彩空间转换参数），以 (质量, 编码器) 为键的只读映射
+QUALITY_PRESETS = MappingProxyType({
+    ("high", "libx264"): ("-preset", "slow", "-crf", "18", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("high", "libx265"): ("-preset", "slow", "-crf", "22", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("high", "libvpx-vp9"): ("-b:v", "2M", "-crf", "24", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("high", "h264_nvenc"): ("-preset", "p6", "-rc", "vbr", "-cq", "19", "-b:v", "0", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("high", "h264_qsv"): ("-preset", "slow", "-global_quality", "20", "-pix_fmt", "nv12", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("high", "h264_vaapi"): ("-qp", "20", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("high", "h264_videotoolbox"): ("-q:v", "70", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("high", "h264_amf"): ("-quality", "quality", "-rc", "cqp", "-qp_i", "20", "-qp_p", "20", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("medium", "libx264"): ("-preset", "medium", "-crf", "23", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("medium", "libx265"): ("-preset", "medium", "-crf", "28", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("medium", "libvpx-vp9"): ("-b:v", "1M", "-crf", "30", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("medium", "h264_nvenc"): ("-preset", "p5", "-rc", "vbr", "-cq", "23", "-b:v", "0", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("medium", "h264_qsv"): ("-preset", "medium", "-global_quality", "23", "-pix_fmt", "nv12", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("medium", "h264_vaapi"): ("-qp", "24", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("medium", "h264_videotoolbox"): ("-q:v", "60", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("medium", "h264_amf"): ("-quality", "balanced", "-rc", "cqp", "-qp_i", "23", "-qp_p", "23", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("low", "libx264"): ("-preset", "ultrafast", "-crf", "28", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("low", "libx265"): ("-preset", "ultrafast", "-crf", "35", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("low", "libvpx-vp9"): ("-b:v", "500k", "-crf", "35", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("low", "h264_nvenc"): ("-preset", "p2", "-rc", "vbr", "-cq", "28", "-b:v", "0", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("low", "h264_qsv"): ("-preset", "veryfast", "-global_quality", "28", "-pix_fmt", "nv12", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("low", "h264_vaapi"): ("-qp", "28", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("low", "h264_videotoolbox"): ("-q:v", "45", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+    ("low", "h264_amf"): ("-quality", "speed", "-rc", "cqp", "-qp_i", "28", "-qp_p", "28", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"),
+})
+
+# 各质量等级对应的音频比特率
+AUDIO_BITRATES = MappingProxyType({
+    "high": "192k",
+    "medium": "128k",
+    "low": "96k",
+})
+
+# 预览片段可直接流复制的视频编码和像素格式（MoviePy和浏览器均可直接播放）
+PREVIEW_COPY_VIDEO_CODECS = frozenset({'h264'})
+PREVIEW_COPY_PIX_FMTS = frozenset({'yuv420p', 'yuvj420p'})
+PREVIEW_COPY_AUDIO_CODECS = frozenset({'aac'})
+
+# 动画预览（WebP/GIF）的帧率
+PREVIEW_ANIMATION_FPS = 12
+
+# get_video_summary只查询兼容性检查需要的字段，ffprobe输出从数十KB缩减到几百字节
+SUMMARY_ENTRIES = "stream=codec_type,codec_name,pix_fmt,color_space,duration:format=duration"
+
+@functools.lru_cache(maxsize=32)
+def _probe_video(ffprobe_path, input_path, mtime_ns, size, entries=None):
+    """
+    运行ffprobe获取视频信息
+    
+    mtime_ns和size只作为缓存键的一部分，文件被修改后缓存自动失效。
+    entries为None时输出全部格式和流信息，否则只输出 -show_entries 指定的字段。
+    失败时抛出异常，失败结果不会被缓存。
+    """
+    cmd = [
+        ffprobe_path,
+        "-v", "quiet",
+        "-print_format", "json",
+    ]
+    if entries:
+        cmd.extend(["-show_entries", entries])
+    else:
+        cmd.extend(["-show_format", "-show_streams"])
+    cmd.append(input_path)
+    
+    # 读取原始字节，json.loads直接解析UTF-8字节，stderr只在失败时解码
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise Exception(f"FFprobe执行失败: {result.stderr.decode('utf-8', 'replace')}")
+    
+    return json.loads(result.stdout)
+
+class FrameExtractor:
+    """
+    基于PyAV的帧提取器，保持容器打开，反复定位时无需重新启动进程和初始化解码器
+    """
+    
+    def __init__(self, input_path):
+        """
+        打开视频文件
+        
+        Args:
+            input_path: 输入视频文件路径
+        """
+        if av is None:
+            raise ImportError("未安装PyAV，无法使用FrameExtractor")
+        self.input_path = input_path
+        self.container = av.open(input_path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+    
+    def seek(self, t):
+        """
+        定位到指定时间并解码一帧
+        
+        Args:
+            t: 时间位置（秒）
+            
+        Returns:
+            PIL.Image: 不早于该时间的第一帧图像
+        """
+        stream = self.stream
+        start = float(stream.start_time * stream.time_base) if stream.start_time is not None else 0.0
+        target = start + t
+        # seek只能跳到目标之前的关键帧，之后向前解码到目标时间
+        self.container.seek(int(target / stream.time_base), stream=stream)
+        last_frame = None
+        for frame in self.container.decode(stream):
+            last_frame = frame
+            if frame.time is None or frame.time >= target:
+                break
+        if last_frame is None:
+            raise Exception(f"无法在 {t:.2f}s 处解码视频帧")
+        return last_frame.to_image()
+    
+    def close(self):
+        """关闭视频文件"""
+        self.container.close()
+
+
 class VideoConverter:
     """视频转换类，提供视频文件转换功能"""
     
-    def __init__(self, ffmpeg_path=None, ffprobe_path=None, log_function=None):
+    _executable_cache = {}  # 可执行文件路径缓存 {name: path}
+    
+    def __init__(self, ffmpeg_path=None, ffprobe_path=None, log_function=None, debug=False):
         """
         初始化转换器
         
@@ -67,11 +280,17 @@ class VideoConverter:
             ffmpeg_path: ffmpeg可执行文件路径，如果为None将自动搜索
             ffprobe_path: ffprobe可执行文件路径，如果为None将自动搜索
             log_function: 日志记录回调函数
+            debug: 出错时是否将完整的异常堆栈写入日志 (默认: False)
         """
         self.ffmpeg_path = ffmpeg_path or self._find_executable('ffmpeg')
         self.ffprobe_path = ffprobe_path or self._find_executable('ffprobe')
         self.log_function = log_function
+        self.debug = debug
         self._temp_files = []  # 临时文件列表，用于清理
+        self._hw_encoder = None  # 硬件编码器探测结果，None表示尚未探测
+        self._hw_hevc_ok = None  # 对应的HEVC硬件编码器是否可用，None表示尚未探测
+        self._has_zscale = None  # FFmpeg是否编译了zimg的zscale滤镜，None表示尚未探测
+        self._frame_extractors = OrderedDict()  # PyAV帧提取器LRU缓存 {path: ((mtime_ns, size), FrameExtractor)}
     
     def log(self, message):
         """记录日志消息"""
@@ -81,28 +300,274 @@ class VideoConverter:
             print(message)
     
     def _find_executable(self, name):
-        """查找可执行文件路径"""
-        import platform
+        """查找可执行文件路径（结果在类级别缓存，所有实例共享）"""
+        if name not in VideoConverter._executable_cache:
+            # shutil.which在进程内遍历PATH，无需启动where/which子进程
+            VideoConverter._executable_cache[name] = shutil.which(name)
+        return VideoConverter._executable_cache[name]
+    
+    def _detect_hw_encoder(self):
+        """
+        探测可用的硬件H.264编码器，结果缓存在实例上，只探测一次
+        
+        Returns:
+            str: 硬件编码器名称（如 'h264_nvenc'），不可用时返回None
+        """
+        if self._hw_encoder is not None:
+            return self._hw_encoder or None
+        
+        self._hw_encoder = ''  # 空字符串表示已探测但没有可用的硬件编码器
+        if not self.ffmpeg_path:
+            return None
+        
         try:
-            if platform.system() == "Windows":
-                result = subprocess.run(["where", name], 
-                                      capture_output=True, 
-                                      text=True, 
-                                      encoding='utf-8')  # 明确指定UTF-8编码
-            else:
-                result = subprocess.run(["which", name], 
-                                      capture_output=True, 
-                                      text=True,
-                                      encoding='utf-8')  # 明确指定UTF-8编码
-                
-            if result.returncode == 0:
-                paths = result.stdout.strip().split('\n')
-                if paths:
-                    return paths[0]
+            result = subprocess.run([self.ffmpeg_path, '-hide_banner', '-encoders'],
+                                    capture_output=True)
+            if result.returncode != 0:
+                return None
+            
+            available = result.stdout
+            for encoder in HW_ENCODER_CANDIDATES.get(_SYSTEM, []):
+                if f" {encoder} ".encode() not in available:
+                    continue
+                # 编译进FFmpeg不代表有对应硬件，试编码一帧确认可用
+                if self._test_hw_encoder(encoder):
+                    self._hw_encoder = encoder
+                    self.log(f"检测到可用的硬件编码器: {encoder}")
+                    break
+        except Exception as e:
+            self.log(f"探测硬件编码器时出错: {e}")
+        
+        return self._hw_encoder or None
+    
+    def _hw_hevc_available(self, hw_encoder):
+        """
+        试编码确认硬件编码器对应的HEVC编码器可用，结果缓存在实例上，只探测一次
+        
+        Args:
+            hw_encoder: _detect_hw_encoder返回的硬件H.264编码器名称
+            
+        Returns:
+            bool: HEVC硬件编码器可用时返回True
+        """
+        if self._hw_hevc_ok is None:
+            hevc_encoder = HW_HEVC_ENCODER_MAP[hw_encoder]
+            self._hw_hevc_ok = self._test_hw_encoder(hw_encoder, hevc_encoder)
+            if not self._hw_hevc_ok:
+                self.log(f"硬件HEVC编码器 {hevc_encoder} 不可用，将使用libx265")
+        return self._hw_hevc_ok
+    
+    def _zscale_available(self):
+        """
+        探测FFmpeg是否支持zscale滤镜（zimg），结果缓存在实例上，只探测一次
+        
+        Returns:
+            bool: 支持zscale时返回True
+        """
+        if self._has_zscale is not None:
+            return self._has_zscale
+        
+        self._has_zscale = False
+        if not self.ffmpeg_path:
+            return False
+        
+        try:
+            result = subprocess.run([self.ffmpeg_path, '-hide_banner', '-filters'],
+                                    capture_output=True)
+            self._has_zscale = result.returncode == 0 and b" zscale " in result.stdout
         except Exception as e:
-            self.log(f"查找 {name} 时出错: {e}")
+            self.log(f"探测zscale滤镜时出错: {e}")
         
-        return None
+        return self._has_zscale
+    
+    def _test_hw_encoder(self, encoder, codec=None):
+        """使用测试图像编码一帧，确认硬件编码器实际可用，codec为实际测试的编码器（默认与encoder相同）"""
+        if encoder == 'h264_vaapi' and not os.path.exists(VAAPI_DEVICE):
+            return False
+        
+        cmd = [
+            self.ffmpeg_path,
+            "-hide_banner",
+            "-v", "error",
+            *HW_ENCODER_INPUT_ARGS.get(encoder, []),
+            "-f", "lavfi",
+            "-i", "color=c=black:s=256x256:d=0.1",
+            "-frames:v", "1",
+        ]
+        if encoder in HW_ENCODER_FILTERS:
+            cmd.extend(["-vf", HW_ENCODER_FILTERS[encoder]])
+        cmd.extend(["-c:v", codec or encoder, "-f", "null", "-"])
+        
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
+            return result.returncode == 0
+        except Exception:
+            return False
+    
+    @staticmethod
+    def _parse_resize(resize):
+        """解析 'WIDTHxHEIGHT' 或 'WIDTH:HEIGHT' 格式的尺寸字符串，返回 (width, height)"""
+        width, _, height = str(resize).replace(":", "x").partition("x")
+        return width, height
+    
+    @staticmethod
+    def _strip_option(params, option):
+        """从参数列表中移除指定选项及其值"""
+        result = []
+        skip = False
+        for item in params:
+            if skip:
+                skip = False
+            elif item == option:
+                skip = True
+            else:
+                result.append(item)
+        return result
+    
+    def _drain(self, pipe, line_queue, tag):
+        """后台线程：按块读取管道输出并拆分成行，以 (tag, line) 放入队列，读取结束后放入 (tag, None)"""
+        try:
+            # read1每次最多一次系统调用，返回当前已有的数据，FFmpeg成批输出时比逐行读取少得多的调用
+            buf = b''
+            while True:
+                chunk = pipe.read1(PIPE_READ_SIZE)
+                if not chunk:
+                    break
+                *lines, buf = (buf + chunk).split(b'\n')
+                for raw in lines:
+                    line = raw.strip()
+                    if line:
+                        line_queue.put((tag, line))
+            line = buf.strip()
+            if line:
+                line_queue.put((tag, line))
+        finally:
+            pipe.close()
+            line_queue.put((tag, None))
+    
+    def _format_progress(self, progress, duration):
+        """将一个 -progress 数据块格式化为日志文本"""
+        parts = []
+        out_time = progress.get(b"out_time_us") or progress.get(b"out_time_ms")  # 旧版本FFmpeg只有out_time_ms（单位实际为微秒）
+        try:
+            seconds = int(out_time) / 1000000
+        except (TypeError, ValueError):
+            seconds = None
+        
+        if seconds is not None and duration:
+            parts.append(f"进度: {min(100.0, seconds / duration * 100):.1f}%")
+        if seconds is not None:
+            parts.append(f"时间: {seconds:.1f}s")
+        for key, label in ((b"frame", "帧"), (b"fps", "FPS"), (b"speed", "速度")):
+            value = progress.get(key)
+            if value and value != b"N/A":
+                parts.append(f"{label}: {value.decode('ascii', 'replace')}")
+        return ", ".join(parts)
+    
+    def _run_ffmpeg_streaming(self, cmd, duration=None, errors=None):
+        """
+        运行FFmpeg命令，由后台线程读取输出并写入日志
+        
+        命令需包含 "-progress pipe:1 -nostats"：stdout输出机器可读的进度数据，
+        stderr只保留错误信息。
+        
+        Args:
+            cmd: 命令参数列表
+            duration: 输入视频时长（秒），用于计算进度百分比
+            errors: 可选的列表，stderr的每一行（bytes）会追加到其中，供调用方判断失败原因
+            
+        Returns:
+            int: FFmpeg返回码
+        """
+        # 不输出进度数据的命令（如分段切分）不需要读取stdout
+        has_progress = "-progress" in cmd
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE if has_progress else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            bufsize=io.DEFAULT_BUFFER_SIZE
+        )
+        
+        # 后台线程持续读取stdout和stderr，避免管道写满阻塞FFmpeg
+        line_queue = queue.Queue()
+        readers = [threading.Thread(target=self._drain, args=(process.stderr, line_queue, "error"), daemon=True)]
+        if has_progress:
+            readers.append(threading.Thread(target=self._drain, args=(process.stdout, line_queue, "progress"), daemon=True))
+        for reader in readers:
+            reader.start()
+        
+        progress = {}
+        last_log_time = 0
+        running = len(readers)
+        while running:
+            tag, line = line_queue.get()
+            if line is None:
+                running -= 1
+                continue
+            
+            if tag == "error":
+                if errors is not None:
+                    errors.append(line)
+                self.log(line.decode('utf-8', 'replace'))
+                continue
+            
+            # 累积 key=value 直到 progress=continue|end 为一个数据块
+            key, _, value = line.partition(b"=")
+            progress[key] = value
+            if key != b"progress":
+                continue
+            
+            # 每个数据块最多输出一条日志，并按时间间隔节流
+            now = time.monotonic()
+            if value == b"end" or now - last_log_time >= PROGRESS_LOG_INTERVAL:
+                last_log_time = now
+                self.log(self._format_progress(progress, duration))
+            progress = {}
+        
+        for reader in readers:
+            reader.join()
+        return process.wait()
+    
+    @staticmethod
+    def _hwaccel_failed(errors):
+        """根据FFmpeg的stderr输出判断失败是否由硬件解码初始化引起"""
+        return any(marker in line.lower() for line in errors for marker in HWACCEL_ERROR_MARKERS)
+    
+    @staticmethod
+    def _probe_input(input_path):
+        """
+        检查输入文件，只调用一次stat
+        
+        Returns:
+            (path, st): Path对象和os.stat_result
+            
+        Raises:
+            FileNotFoundError: 文件不存在
+            ValueError: 文件为空
+        """
+        path = Path(input_path)
+        try:
+            st = path.stat()
+        except OSError:
+            raise FileNotFoundError(f"输入文件不存在: {input_path}")
+        if st.st_size == 0:
+            raise ValueError(f"输入文件为空: {input_path}")
+        return path, st
+    
+    @staticmethod
+    def _faststart_args(output_path):
+        """MP4/MOV输出时返回 -movflags +faststart 参数，便于MoviePy和播放器无需读完整个文件即可定位"""
+        if os.path.splitext(output_path)[1].lower() in FASTSTART_EXTENSIONS:
+            return ["-movflags", "+faststart"]
+        return []
+    
+    @staticmethod
+    def _output_ok(output_path):
+        """检查输出文件是否已创建且非空"""
+        try:
+            return os.stat(output_path).st_size > 0
+        except OSError:
+            return False
     
     def cleanup(self):
         """清理临时文件"""
@@ -115,10 +580,15 @@ class VideoConverter:
                 self.log(f"删除临时文件 {temp_file} 失败: {e}")
         
         self._temp_files = []
+        
+        for _, extractor in self._frame_extractors.values():
+            extractor.close()
+        self._frame_extractors.clear()
+        _probe_video.cache_clear()
     
     def get_video_info(self, input_path):
         """
-        获取视频文件信息
+        获取视频文件信息（结果会被缓存，调用方不应修改返回的字典）
         
         Args:
             input_path: 输入视频文件路径
@@ -130,31 +600,65 @@ class VideoConverter:
             self.log("FFprobe不可用，无法获取视频信息")
             return None
         
-        if not os.path.exists(input_path):
+        try:
+            st = os.stat(input_path)
+            # 同一文件（路径、修改时间、大小均未变）的重复查询直接返回缓存结果
+            return _probe_video(self.ffprobe_path, os.path.abspath(input_path), st.st_mtime_ns, st.st_size)
+        
+        except FileNotFoundError:
             self.log(f"文件不存在: {input_path}")
             return None
+        except Exception as e:
+            self.log(f"获取视频信息时出错: {e}")
+            return None
+    
+    def get_video_summary(self, input_path, st=None):
+        """
+        获取视频关键信息摘要，只查询编码、像素格式、色彩空间和时长，比get_video_info快得多
         
-        try:
-            cmd = [
-                self.ffprobe_path,
-                "-v", "quiet",
-                "-print_format", "json",
-                "-show_format",
-                "-show_streams",
-                input_path
-            ]
-            
-            # 明确指定UTF-8编码处理输出
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-            if result.returncode != 0:
-                self.log(f"FFprobe执行失败: {result.stderr}")
-                return None
+        Args:
+            input_path: 输入视频文件路径
+            st: 调用方已获取的os.stat_result，传入时不再重复stat
             
-            return json.loads(result.stdout)
+        Returns:
+            dict: {'video': {...}, 'audio': {...}, 'duration': float}，
+                  video/audio为第一个视频/音频流（不存在时为None），duration无法确定时为0；
+                  如果失败则返回None
+        """
+        if not self.ffprobe_path:
+            self.log("FFprobe不可用，无法获取视频信息")
+            return None
         
+        try:
+            if st is None:
+                st = os.stat(input_path)
+            data = _probe_video(self.ffprobe_path, os.path.abspath(input_path), st.st_mtime_ns, st.st_size,
+                                SUMMARY_ENTRIES)
+        except FileNotFoundError:
+            self.log(f"文件不存在: {input_path}")
+            return None
         except Exception as e:
             self.log(f"获取视频信息时出错: {e}")
             return None
+        
+        summary = {"video": None, "audio": None, "duration": 0}
+        for stream in data.get("streams", []):
+            stream_type = stream.get("codec_type")
+            if stream_type == "video" and summary["video"] is None:
+                summary["video"] = stream
+            elif stream_type == "audio" and summary["audio"] is None:
+                summary["audio"] = stream
+        
+        # 优先使用视频流时长，否则尝试从格式信息获取
+        for source in (summary["video"] or {}, data.get("format", {})):
+            try:
+                summary["duration"] = float(source.get("duration", 0))
+            except (ValueError, TypeError):
+                continue
+            if summary["duration"] > 0:
+                break
+        
+        return summary
     
     def identify_problematic_streams(self, input_path):
         """
@@ -171,43 +675,45 @@ class VideoConverter:
         if not self.ffprobe_path:
             return result
         
-        info = self.get_video_info(input_path)
-        if not info:
+        summary = self.get_video_summary(input_path)
+        if not summary:
             return result
         
-        # 检查视频流
-        for stream in info.get("streams", []):
-            if stream.get("codec_type") == "video":
-                codec_name = stream.get("codec_name", "").lower()
-                
-                # 检查可能导致问题的编解码器
-                if codec_name in ["hevc", "h265", "av1", "vp9"]:
-                    result["video_issues"].append(
-                        f"视频使用 {codec_name.upper()} 编码，可能不被MoviePy兼容"
-                    )
-                
-                # 检查像素格式
-                pix_fmt = stream.get("pix_fmt", "").lower()
-                if pix_fmt and pix_fmt not in ["yuv420p", "yuvj420p", "rgb24", "bgr24"]:
-                    result["video_issues"].append(
-                        f"视频使用 {pix_fmt} 像素格式，可能不被MoviePy兼容"
-                    )
-                
-                # 检查色彩空间
-                color_space = stream.get("color_space", "").lower()
-                if color_space and color_space not in ["bt709", "bt601", "bt470bg", "smpte170m"]:
-                    result["video_issues"].append(
-                        f"视频使用 {color_space} 色彩空间，可能不被MoviePy兼容"
-                    )
+        # 检查视频流（MoviePy只读取第一个视频流和第一个音频流）
+        stream = summary["video"]
+        if stream:
+            codec_name = stream.get("codec_name", "").lower()
             
-            elif stream.get("codec_type") == "audio":
-                codec_name = stream.get("codec_name", "").lower()
-                
-                # 检查可能导致问题的音频编解码器
-                if codec_name not in ["aac", "mp3", "pcm_s16le"]:
-                    result["audio_issues"].append(
-                        f"音频使用 {codec_name} 编码，可能不被MoviePy兼容"
-                    )
+            # 检查可能导致问题的编解码器
+            if codec_name in PROBLEM_VIDEO_CODECS:
+                result["video_issues"].append(
+                    f"视频使用 {codec_name.upper()} 编码，可能不被MoviePy兼容"
+                )
+            
+            # 检查像素格式
+            pix_fmt = stream.get("pix_fmt", "").lower()
+            if pix_fmt and pix_fmt not in OK_PIXEL_FORMATS:
+                result["video_issues"].append(
+                    f"视频使用 {pix_fmt} 像素格式，可能不被MoviePy兼容"
+                )
+            
+            # 检查色彩空间
+            color_space = stream.get("color_space", "").lower()
+            if color_space and color_space not in OK_COLOR_SPACES:
+                result["video_issues"].append(
+                    f"视频使用 {color_space} 色彩空间，可能不被MoviePy兼容"
+                )
+        
+        # 检查音频流
+        stream = summary["audio"]
+        if stream:
+            codec_name = stream.get("codec_name", "").lower()
+            
+            # 检查可能导致问题的音频编解码器
+            if codec_name not in OK_AUDIO_CODECS:
+                result["audio_issues"].append(
+                    f"音频使用 {codec_name} 编码，可能不被MoviePy兼容"
+                )
         
         return result
     
@@ -224,6 +730,14 @@ class VideoConverter:
                 - quality: 'low', 'medium', 'high' (默认: 'medium')
                 - keep_audio: 是否保留音频 (默认: True)
                 - resize: 调整大小 (格式: 'WIDTHxHEIGHT')
+                - hw_encode: 可用时使用硬件编码器替代libx264/libx265 (默认: True)
+                - hw_decode: 使用硬件解码，硬件解码初始化失败时自动回退到软件解码，
+                  None表示只在使用硬件编码器时启用 (默认: None)
+                - threads: FFmpeg编码线程数，None表示由FFmpeg自动决定 (默认: None)
+                - segments: 长视频分段并行编码的分段数，None或1表示不分段 (默认: None)
+                  按关键帧切分，只适用于关键帧都是IDR帧（闭合GOP）的源，否则分段边界处会丢帧或花屏
+                - genpts: 为时间戳损坏的源重新生成PTS (默认: False)
+                - target_size_mb: 目标文件大小（MB），设置后使用两遍VBR编码代替CRF (默认: None)
             delete_original: 转换成功后是否删除原始文件 (默认: False)
                 
         Returns:
@@ -232,8 +746,10 @@ class VideoConverter:
         if not self.ffmpeg_path:
             return False, None, "FFmpeg不可用，无法转换视频"
         
-        if not os.path.exists(input_path):
-            return False, None, f"输入文件不存在: {input_path}"
+        try:
+            source, source_stat = self._probe_input(input_path)
+        except (OSError, ValueError) as e:
+            return False, None, str(e)
         
         # 默认选项
         default_options = {
@@ -242,7 +758,13 @@ class VideoConverter:
             "quality": "medium",
             "keep_audio": True,
             "resize": None,
-            "format": "mp4"
+            "format": "mp4",
+            "hw_encode": True,
+            "hw_decode": None,
+            "threads": None,
+            "segments": None,
+            "genpts": False,
+            "target_size_mb": None
         }
         
         # 合并选项
@@ -252,13 +774,7 @@ class VideoConverter:
         
         # 如果未指定输出路径，则生成一个
         if not output_path:
-            dirname = os.path.dirname(input_path)
-            basename = os.path.basename(input_path)
-            name, _ = os.path.splitext(basename)
-            output_path = os.path.join(
-                dirname, 
-                f"{name}_converted_{int(time.time())}.{opts['format']}"
-            )
+            output_path = str(source.with_name(f"{source.stem}_converted_{int(time.time())}.{opts['format']}"))
         
         # 确保输出目录存在
         output_dir = os.path.dirname(output_path)
@@ -269,101 +785,199 @@ class VideoConverter:
             except Exception as e:
                 return False, None, f"无法创建输出目录: {str(e)}"
         
-        # 质量预设（添加色彩空间转换参数）
-        quality_presets = {
-            "high": {
-                "libx264": ["-preset", "slow", "-crf", "18", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"],
-                "libx265": ["-preset", "slow", "-crf", "22", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"],
-                "libvpx-vp9": ["-b:v", "2M", "-crf", "24", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"],
-                "audio_bitrate": "192k"
-            },
-            "medium": {
-                "libx264": ["-preset", "medium", "-crf", "23", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"],
-                "libx265": ["-preset", "medium", "-crf", "28", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"],
-                "libvpx-vp9": ["-b:v", "1M", "-crf", "30", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"],
-                "audio_bitrate": "128k"
-            },
-            "low": {
-                "libx264": ["-preset", "ultrafast", "-crf", "28", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"],
-                "libx265": ["-preset", "ultrafast", "-crf", "35", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"],
-                "libvpx-vp9": ["-b:v", "500k", "-crf", "35", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"],
-                "audio_bitrate": "96k"
-            }
-        }
-        
         # 选择质量
         quality = opts["quality"]
-        if quality not in quality_presets:
+        if quality not in AUDIO_BITRATES:
             quality = "medium"
         
         # 获取视频编解码器设置
         video_codec = opts["video_codec"]
-        video_params = quality_presets[quality].get(
-            video_codec, 
-            quality_presets[quality]["libx264"]  # 默认使用libx264设置
-        )
+        software_params = (QUALITY_PRESETS.get((quality, video_codec))
+                           or QUALITY_PRESETS[(quality, "libx264")])  # 默认使用libx264设置
+        video_params = software_params
+        
+        # 有可用的硬件编码器时替换软件编码器，HEVC编码器需单独试编码确认
+        hw_encoder = None
+        if opts["hw_encode"] and not opts["target_size_mb"] and video_codec in ("libx264", "libx265"):
+            hw_encoder = self._detect_hw_encoder()
+            if hw_encoder and video_codec == "libx265" and not self._hw_hevc_available(hw_encoder):
+                hw_encoder = None
+        if hw_encoder:
+            video_params = QUALITY_PRESETS[(quality, hw_encoder)]
+            video_codec = hw_encoder if opts["video_codec"] == "libx264" else HW_HEVC_ENCODER_MAP[hw_encoder]
         
         # 音频比特率
-        audio_bitrate = quality_presets[quality]["audio_bitrate"]
+        audio_bitrate = AUDIO_BITRATES[quality]
         
-        # 构建基本命令
-        cmd = [
-            self.ffmpeg_path,
-            "-y",  # 覆盖输出文件
-            "-i", input_path,  # 输入文件
-            "-c:v", video_codec,  # 视频编解码器
-            *video_params,  # 视频质量参数（包含色彩空间参数）
-        ]
+        # 解析目标尺寸
+        resize = self._parse_resize(opts["resize"]) if opts["resize"] else None
         
-        # 添加音频相关命令
-        if opts["keep_audio"]:
-            cmd.extend([
-                "-c:a", opts["audio_codec"],  # 音频编解码器
-                "-b:a", audio_bitrate,  # 音频比特率
-                "-ar", "44100",  # 音频采样率
-            ])
+        # 软件缩放滤镜：低质量使用最快的fast_bilinear，其余优先使用zimg的lanczos（比swscale快约一倍）
+        if not resize:
+            software_scale = None
+        elif quality == "low":
+            software_scale = f"scale={resize[0]}:{resize[1]}:flags=fast_bilinear+full_chroma_int"
+        elif self._zscale_available():
+            software_scale = f"zscale=w={resize[0]}:h={resize[1]}:filter=lanczos"
         else:
-            cmd.extend(["-an"])  # 不包含音频
+            software_scale = f"scale={resize[0]}:{resize[1]}:flags=lanczos"
         
-        # 调整大小（如果指定）
-        if opts["resize"]:
-            cmd.extend(["-vf", f"scale={opts['resize']}"])
+        # 获取视频时长用于计算进度百分比和两遍编码的目标码率
+        summary = self.get_video_summary(input_path, source_stat)
+        duration = summary["duration"] if summary else None
         
-        # 添加输出文件路径
-        cmd.append(output_path)
+        # 指定目标大小时按时长计算视频码率，两遍编码使文件大小接近目标值
+        passlog_prefix = None
+        if opts["target_size_mb"]:
+            if not duration:
+                return False, None, "无法获取视频时长，不能按目标大小编码"
+            audio_k = int(audio_bitrate.rstrip("k")) if opts["keep_audio"] else 0
+            bitrate_k = int((opts["target_size_mb"] * 8192 - audio_k * duration) / duration)
+            if bitrate_k <= 0:
+                return False, None, f"目标大小 {opts['target_size_mb']}MB 过小，无法容纳音频"
+            for option in ("-crf", "-b:v"):
+                video_params = self._strip_option(video_params, option)
+            video_params = [*video_params, "-b:v", f"{bitrate_k}k"]
+            if video_codec in TWO_PASS_CODECS or video_codec == "libx265":
+                passlog_prefix = os.path.join(tempfile.gettempdir(), f"passlog_{os.getpid()}_{int(time.time() * 1000)}")
+                if video_codec == "libx265":
+                    self._temp_files.extend([f"{passlog_prefix}.log", f"{passlog_prefix}.log.cutree"])
+                else:
+                    self._temp_files.extend([f"{passlog_prefix}-0.log", f"{passlog_prefix}-0.log.mbtree"])
+            else:
+                # 不支持两遍编码的编码器会忽略-pass，两遍只会重复编码，改用单遍平均码率编码
+                self.log(f"编码器 {video_codec} 不支持两遍编码，使用单遍平均码率编码: 视频码率={bitrate_k}k")
+        
+        def build_cmd(hw_decode, pass_no=None):
+            """构建转换命令，hw_decode为True时使用硬件解码，pass_no为两遍编码的第几遍"""
+            decode_args = []
+            params = video_params
+            video_filters = []
+            
+            if hw_decode and hw_encoder in HW_DECODE_MAP:
+                # 解码、缩放、编码全部在显存中完成，帧不回传到系统内存
+                hwaccel, scale_filter = HW_DECODE_MAP[hw_encoder]
+                decode_args = ["-hwaccel", hwaccel, "-hwaccel_output_format", hwaccel]
+                params = self._strip_option(params, "-pix_fmt")  # 显存帧不能再做软件像素格式转换
+                if resize:
+                    video_filters.append(f"{scale_filter}=w={resize[0]}:h={resize[1]}")
+            else:
+                if hw_decode:
+                    # 调用方明确要求时，软件编码器也使用硬件解码，解码后自动回传到系统内存
+                    decode_args = ["-hwaccel", "auto"]
+                if software_scale:
+                    video_filters.append(software_scale)
+                # 硬件编码器需要的上传滤镜放在滤镜链末尾
+                if hw_encoder in HW_ENCODER_FILTERS:
+                    video_filters.append(HW_ENCODER_FILTERS[hw_encoder])
+            
+            cmd = [
+                self.ffmpeg_path,
+                "-y",  # 覆盖输出文件
+                "-progress", "pipe:1",  # 进度数据输出到stdout
+                "-nostats",  # 关闭stderr上的统计行
+                "-loglevel", "error",  # stderr只输出错误
+                *HW_ENCODER_INPUT_ARGS.get(hw_encoder, []),  # 硬件设备初始化参数（必须在输入文件之前）
+                *decode_args,  # 硬件解码参数
+                *(["-fflags", "+genpts"] if opts["genpts"] else []),  # 重新生成时间戳
+                "-i", input_path,  # 输入文件
+                "-c:v", video_codec,  # 视频编解码器
+                *params,  # 视频质量参数（包含色彩空间参数）
+            ]
+            
+            # 限制编码线程数，避免并行转换时CPU超额订阅
+            if opts["threads"]:
+                cmd.extend(["-threads", str(opts["threads"])])
+            
+            if pass_no and video_codec == "libx265":
+                # libx265忽略-pass/-passlogfile，两遍参数需通过x265自身的参数传递（路径中的冒号和反斜杠需转义）
+                stats_path = f"{passlog_prefix}.log".replace("\\", "\\\\").replace(":", "\\:")
+                cmd.extend(["-x265-params", f"pass={pass_no}:stats={stats_path}"])
+            elif pass_no:
+                cmd.extend(["-pass", str(pass_no), "-passlogfile", passlog_prefix])
+            
+            if video_filters:
+                cmd.extend(["-vf", ",".join(video_filters)])
+            
+            # 低质量时像素格式转换等自动插入的缩放器也使用最快的算法
+            if quality == "low":
+                cmd.extend(["-sws_flags", "fast_bilinear+full_chroma_int"])
+            
+            # 第一遍只分析视频，不输出文件
+            if pass_no == 1:
+                cmd.extend(["-an", "-f", "null", os.devnull])
+                return cmd
+            
+            # 添加音频相关命令
+            if opts["keep_audio"]:
+                cmd.extend([
+                    "-c:a", opts["audio_codec"],  # 音频编解码器
+                    "-b:a", audio_bitrate,  # 音频比特率
+                    "-ar", "44100",  # 音频采样率
+                ])
+            else:
+                cmd.extend(["-an"])  # 不包含音频
+            
+            # 添加输出文件路径
+            cmd.extend(self._faststart_args(output_path))
+            cmd.append(output_path)
+            return cmd
         
-        self.log(f"开始转换视频: {os.path.basename(input_path)}")
+        self.log(f"开始转换视频: {source.name}")
         self.log(f"输出文件: {output_path}")
         self.log(f"转换参数: 视频编码={video_codec}, 质量={quality}")
         self.log(f"色彩空间将被转换为BT.709")
+        if passlog_prefix:
+            self.log(f"两遍编码: 目标大小={opts['target_size_mb']}MB, 视频码率={bitrate_k}k")
+        
+        # 调用方明确要求时，长视频使用软件编码分段并行编码，突破单个libx264进程的多线程扩展上限
+        n_segments = opts["segments"] or 1
+        use_segments = (
+            not hw_encoder
+            and not passlog_prefix
+            and duration and duration > SEGMENT_MIN_DURATION
+            and n_segments >= 2
+        )
         
         # 执行转换
         try:
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1,
-                encoding='utf-8'  # 明确指定UTF-8编码
-            )
+            return_code = None
+            if use_segments:
+                return_code = self._convert_segmented(input_path, output_path, opts, n_segments, duration)
+                if return_code != 0:
+                    self.log("分段并行编码失败，改用单进程编码...")
+                    return_code = None
             
-            # 读取输出并更新日志
-            while True:
-                output = process.stderr.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    self.log(output.strip())
+            if passlog_prefix:
+                self.log("两遍编码: 第一遍分析...")
+                return_code = self._run_ffmpeg_streaming(build_cmd(False, 1), duration)
+                if return_code == 0:
+                    self.log("两遍编码: 第二遍编码...")
+                    return_code = self._run_ffmpeg_streaming(build_cmd(False, 2), duration)
             
-            # 获取返回码
-            return_code = process.poll()
+            if return_code is None:
+                hw_decode = bool(hw_encoder) if opts["hw_decode"] is None else opts["hw_decode"]
+                errors = []
+                return_code = self._run_ffmpeg_streaming(build_cmd(hw_decode), duration, errors)
+                
+                if return_code != 0 and hw_decode and self._hwaccel_failed(errors):
+                    # 部分源（如10bit或驱动不支持的编码）无法硬件解码，改用软件解码重试
+                    self.log("硬件解码失败，改用软件解码重试...")
+                    return_code = self._run_ffmpeg_streaming(build_cmd(False), duration)
+                
+                if return_code != 0 and hw_encoder:
+                    # 硬件编码器不支持该源（如分辨率或像素格式超出限制），改用原软件编码器重试一次
+                    self.log(f"硬件编码器 {video_codec} 编码失败，改用{opts['video_codec']}重试...")
+                    hw_encoder = None
+                    video_codec = opts["video_codec"]
+                    video_params = software_params
+                    return_code = self._run_ffmpeg_streaming(build_cmd(False), duration)
             
             if return_code != 0:
                 return False, None, f"FFmpeg转换失败，返回代码: {return_code}"
             
             # 检查输出文件是否创建成功
-            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            if not self._output_ok(output_path):
                 return False, None, "转换失败: 输出文件未创建或为空"
             
             # 如果转换成功并且设置了删除原始文件选项
@@ -379,9 +993,184 @@ class VideoConverter:
             
         except Exception as e:
             self.log(f"转换过程发生错误: {str(e)}")
-            traceback.print_exc()
+            self.log(traceback.format_exc())
             return False, None, f"转换错误: {str(e)}"
     
+    def _convert_segmented(self, input_path, output_path, opts, n_segments, duration):
+        """
+        分段并行编码：按关键帧切分视频 → 并行编码各分段 → 无损拼接并编码音频
+        
+        Args:
+            input_path: 输入视频文件路径
+            output_path: 输出视频文件路径
+            opts: 已合并默认值的转换选项
+            n_segments: 目标分段数
+            duration: 视频时长（秒）
+            
+        Returns:
+            int: 0表示成功，非0表示失败
+        """
+        segment_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(output_path) or None)
+        try:
+            # 第一步：按关键帧无损切分视频流（音频最后单独编码一次，避免分段边界处的爆音）
+            self.log(f"分段并行编码: 将视频切分为约 {n_segments} 段...")
+            split_cmd = [
+                self.ffmpeg_path,
+                "-y",
+                "-nostats",
+                "-loglevel", "error",
+                "-i", input_path,
+                "-map", "0:v:0",
+                "-c", "copy",
+                "-f", "segment",
+                "-segment_time", f"{duration / n_segments:.3f}",
+                "-reset_timestamps", "1",
+                os.path.join(segment_dir, "seg_%03d.mkv")
+            ]
+            return_code = self._run_ffmpeg_streaming(split_cmd)
+            if return_code != 0:
+                return return_code
+            
+            segments = sorted(
+                os.path.join(segment_dir, name) for name in os.listdir(segment_dir)
+                if name.startswith("seg_") and name.endswith(".mkv")
+            )
+            if not segments:
+                return 1
+            
+            # 第二步：并行编码各分段（仅视频）
+            segment_opts = dict(opts, keep_audio=False, threads=SEGMENT_THREADS_PER_JOB,
+                                segments=1, hw_encode=False, hw_decode=False)
+            encoded = [f"{path[:-4]}_enc.mp4" for path in segments]
+            with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+                futures = [
+                    executor.submit(
+                        self._job_converter(f"[分段 {i + 1}/{len(segments)}]").convert_video,
+                        path, encoded[i], segment_opts
+                    )
+                    for i, path in enumerate(segments)
+                ]
+                results = [future.result() for future in futures]
+            
+            if not all(result[0] for result in results):
+                return 1
+            
+            # 第三步：拼接编码后的分段，同时从原文件编码音频
+            concat_path = os.path.join(segment_dir, "concat.txt")
+            with open(concat_path, "w", encoding="utf-8") as f:
+                for path in encoded:
+                    escaped = path.replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            
+            concat_cmd = [
+                self.ffmpeg_path,
+                "-y",
+                "-progress", "pipe:1",
+                "-nostats",
+                "-loglevel", "error",
+                "-f", "concat",
+                "-safe", "0",
+                "-i", concat_path,
+                "-i", input_path,
+                "-map", "0:v",
+                "-c:v", "copy",
+            ]
+            if opts["keep_audio"]:
+                quality = opts["quality"] if opts["quality"] in AUDIO_BITRATES else "medium"
+                concat_cmd.extend([
+                    "-map", "1:a:0?",
+                    "-c:a", opts["audio_codec"],
+                    "-b:a", AUDIO_BITRATES[quality],
+                    "-ar", "44100",
+                ])
+            concat_cmd.extend(self._faststart_args(output_path))
+            concat_cmd.append(output_path)
+            
+            self.log("分段编码完成，正在拼接...")
+            return self._run_ffmpeg_streaming(concat_cmd, duration)
+        
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+    
+    def convert_batch(self, input_paths, options=None, max_workers=None, delete_original=False):
+        """
+        并行转换多个视频文件
+        
+        Args:
+            input_paths: 输入视频文件路径列表
+            options: 转换选项字典，同convert_video；threads默认为BATCH_THREADS_PER_JOB，segments默认为1
+            max_workers: 最大并行任务数，如果为None则按CPU核心数和每个任务的线程数计算
+            delete_original: 转换成功后是否删除原始文件 (默认: False)
+            
+        Returns:
+            list: 与input_paths顺序一致的 (success, output_path, message) 列表
+        """
+        opts = dict(options or {})
+        threads = opts.setdefault("threads", BATCH_THREADS_PER_JOB)
+        opts.setdefault("segments", 1)  # 已按文件并行，单个文件不再分段
+        
+        # 在分发任务前探测一次硬件编码器，避免多个线程重复探测
+        hw_encoder = self._detect_hw_encoder() if opts.get("hw_encode", True) else None
+        if hw_encoder and opts.get("video_codec") == "libx265":
+            self._hw_hevc_available(hw_encoder)
+        
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 1) // threads)
+            if hw_encoder:
+                max_workers = min(max_workers, HW_ENCODER_MAX_SESSIONS)
+        
+        total = len(input_paths)
+        self.log(f"开始批量转换 {total} 个视频，并行任务数: {max_workers}")
+        
+        # 提交前确定输出路径：同目录下仅扩展名不同的文件（如clip.avi和clip.mkv）在同一秒内会生成相同的文件名
+        output_format = opts.get("format", "mp4")
+        timestamp = int(time.time())
+        output_paths = []
+        taken = set()
+        for input_path in input_paths:
+            base = f"{os.path.splitext(input_path)[0]}_converted_{timestamp}"
+            output_path = f"{base}.{output_format}"
+            counter = 0
+            while os.path.normcase(os.path.abspath(output_path)) in taken:
+                counter += 1
+                output_path = f"{base}_{counter}.{output_format}"
+            taken.add(os.path.normcase(os.path.abspath(output_path)))
+            output_paths.append(output_path)
+        
+        results = [None] * total
+        # FFmpeg子进程运行期间不持有GIL，使用线程池即可
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for i, input_path in enumerate(input_paths):
+                worker = self._job_converter(f"[{i + 1}/{total} {os.path.basename(input_path)}]")
+                future = executor.submit(worker.convert_video, input_path, output_paths[i], opts, delete_original)
+                futures[future] = (i, worker)
+            
+            for future in as_completed(futures):
+                i, worker = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = (False, None, f"转换错误: {str(e)}")
+                self._temp_files.extend(worker._temp_files)
+        
+        success_count = sum(1 for result in results if result[0])
+        self.log(f"批量转换完成: {success_count} 成功, {total - success_count} 失败")
+        return results
+    
+    def _job_converter(self, prefix):
+        """创建与当前实例共享配置的转换器，其日志带有任务前缀"""
+        worker = VideoConverter(
+            self.ffmpeg_path,
+            self.ffprobe_path,
+            lambda message: self.log(f"{prefix} {message}"),
+            self.debug
+        )
+        worker._hw_encoder = self._hw_encoder
+        worker._hw_hevc_ok = self._hw_hevc_ok
+        worker._has_zscale = self._has_zscale
+        return worker
+    
     def repair_video(self, input_path, output_path=None, delete_original=False):
         """
         修复视频使其与MoviePy兼容
@@ -397,12 +1186,23 @@ class VideoConverter:
         # 分析视频问题
         issues = self.identify_problematic_streams(input_path)
         
+        # 没有兼容性问题时直接流复制重新封装，不做转码
+        if (self.ffmpeg_path and not issues["video_issues"] and not issues["audio_issues"]
+                and self.get_video_summary(input_path)):
+            result = self._remux_video(input_path, output_path, delete_original)
+            if result[0]:
+                return result
+            # 部分流（如PCM音频）无法直接封装进目标容器时回退到转码
+            self.log(f"{result[2]}，改用转码修复...")
+        
         # 根据问题选择最佳修复策略
         options = {
             "video_codec": "libx264",
             "audio_codec": "aac",
             "quality": "medium",
-            "keep_audio": True
+            "keep_audio": True,
+            "segments": 1,  # 待修复的源可能有开放GOP等问题，按关键帧切分会在分段边界处损坏
+            "genpts": True  # 待修复的源时间戳可能已损坏
         }
         
         if issues["video_issues"]:
@@ -418,6 +1218,57 @@ class VideoConverter:
         # 执行转换
         return self.convert_video(input_path, output_path, options, delete_original)
     
+    def _remux_video(self, input_path, output_path=None, delete_original=False):
+        """
+        流复制重新封装视频（重新生成时间戳并添加+faststart），不转码
+        
+        Args:
+            input_path: 输入视频文件路径
+            output_path: 输出视频文件路径，如果为None则自动生成
+            delete_original: 封装成功后是否删除原始文件 (默认: False)
+            
+        Returns:
+            (success, output_path, message): 成功标志、输出文件路径和消息
+        """
+        source = Path(input_path)
+        if not output_path:
+            output_path = str(source.with_name(f"{source.stem}_converted_{int(time.time())}.mp4"))
+        
+        cmd = [
+            self.ffmpeg_path,
+            "-y",
+            "-progress", "pipe:1",
+            "-nostats",
+            "-loglevel", "error",
+            "-fflags", "+genpts",
+            "-i", input_path,
+            "-c", "copy",
+            *self._faststart_args(output_path),
+            output_path
+        ]
+        
+        self.log(f"未检测到兼容性问题，直接封装: {source.name}")
+        try:
+            summary = self.get_video_summary(input_path)
+            return_code = self._run_ffmpeg_streaming(cmd, summary["duration"] if summary else None)
+            if return_code != 0 or not self._output_ok(output_path):
+                return False, None, f"封装失败，返回代码: {return_code}"
+            
+            if delete_original:
+                try:
+                    os.remove(input_path)
+                    self.log(f"已删除原始文件: {input_path}")
+                except Exception as e:
+                    self.log(f"删除原始文件时出错: {str(e)}")
+            
+            return True, output_path, "无需转码，已直接封装"
+        
+        except Exception as e:
+            self.log(f"封装过程发生错误: {str(e)}")
+            if self.debug:
+                self.log(traceback.format_exc())
+            return False, None, f"封装错误: {str(e)}"
+    
     def create_preview(self, input_path, duration=10, output_path=None, delete_original=False):
         """
         创建视频预览片段
@@ -434,30 +1285,18 @@ class VideoConverter:
         if not self.ffmpeg_path:
             return False, None, "FFmpeg不可用，无法创建预览"
         
-        if not os.path.exists(input_path):
-            return False, None, f"输入文件不存在: {input_path}"
+        try:
+            source, source_stat = self._probe_input(input_path)
+        except (OSError, ValueError) as e:
+            return False, None, str(e)
         
         # 获取视频信息
-        info = self.get_video_info(input_path)
-        if not info:
+        summary = self.get_video_summary(input_path, source_stat)
+        if not summary:
             return False, None, "无法获取视频信息"
         
         # 确定预览开始时间（跳过前5秒，除非视频较短）
-        video_duration = 0
-        for stream in info.get("streams", []):
-            if stream.get("codec_type") == "video":
-                if "duration" in stream:
-                    try:
-                        video_duration = float(stream["duration"])
-                    except (ValueError, TypeError):
-                        pass
-        
-        if not video_duration:
-            # 尝试从格式信息获取
-            try:
-                video_duration = float(info.get("format", {}).get("duration", 0))
-            except (ValueError, TypeError):
-                pass
+        video_duration = summary["duration"]
         
         if video_duration <= 0:
             return False, None, "无法确定视频时长"
@@ -471,43 +1310,54 @@ class VideoConverter:
         
         # 如果未指定输出路径，则生成一个
         if not output_path:
-            dirname = os.path.dirname(input_path)
-            basename = os.path.basename(input_path)
-            name, ext = os.path.splitext(basename)
-            output_path = os.path.join(dirname, f"{name}_preview{ext}")
+            output_path = str(source.with_name(f"{source.stem}_preview{source.suffix}"))
         
-        # 构建命令（添加色彩空间转换参数）
-        cmd = [
-            self.ffmpeg_path,
-            "-y",  # 覆盖输出文件
-            "-ss", str(start_time),  # 起始时间
-            "-i", input_path,  # 输入文件
-            "-t", str(duration),  # 持续时间
-            "-c:v", "libx264",  # 视频编解码器
-            "-preset", "ultrafast",  # 使用最快的预设
-            "-crf", "23",  # 中等质量
-            "-pix_fmt", "yuv420p",  # 像素格式
-            "-color_primaries", "bt709",  # 色彩空间参数
-            "-color_trc", "bt709",       # 色彩空间参数
-            "-colorspace", "bt709",      # 色彩空间参数
-            "-c:a", "aac",  # 音频编解码器
-            "-b:a", "128k",  # 音频比特率
-            output_path  # 输出文件
-        ]
+        # 源视频已是H.264/yuv420p且音频为AAC时直接流复制，速度只受磁盘I/O限制
+        video_stream = summary["video"]
+        audio_stream = summary["audio"]
+        can_copy = bool(
+            video_stream
+            and video_stream.get("codec_name") in PREVIEW_COPY_VIDEO_CODECS
+            and video_stream.get("pix_fmt") in PREVIEW_COPY_PIX_FMTS
+            and (audio_stream is None or audio_stream.get("codec_name") in PREVIEW_COPY_AUDIO_CODECS)
+        )
         
-        self.log(f"创建预览: {os.path.basename(input_path)}")
+        self.log(f"创建预览: {source.name}")
         self.log(f"预览位置: {start_time}s 到 {start_time + duration}s")
         
         try:
-            # 明确指定UTF-8编码
-            process = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
+            process = None
+            if can_copy:
+                # -ss放在-i之前，利用容器索引快速定位到关键帧
+                copy_cmd = [
+                    self.ffmpeg_path,
+                    "-y",  # 覆盖输出文件
+                    "-ss", str(start_time),  # 起始时间
+                    "-i", input_path,  # 输入文件
+                    "-t", str(duration),  # 持续时间
+                    "-map", "0:v:0",  # 第一个视频流
+                    "-map", "0:a:0?",  # 第一个音频流（如果存在）
+                    "-c", "copy",  # 直接复制，不重新编码
+                    "-avoid_negative_ts", "make_zero",  # 时间戳从0开始
+                    *self._faststart_args(output_path),  # moov atom前置
+                    output_path  # 输出文件
+                ]
+                self.log("源视频编码兼容，直接复制流")
+                process = subprocess.run(copy_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                if process.returncode != 0:
+                    self.log("流复制失败，改为重新编码")
+            
+            if process is None or process.returncode != 0:
+                process = subprocess.run(self._build_preview_encode_cmd(input_path, start_time, duration, output_path),
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             
             if process.returncode != 0:
-                self.log(f"创建预览失败: {process.stderr}")
-                return False, None, f"创建预览失败: {process.stderr}"
+                stderr = process.stderr.decode('utf-8', 'replace')
+                self.log(f"创建预览失败: {stderr}")
+                return False, None, f"创建预览失败: {stderr}"
             
             # 检查输出文件是否创建成功
-            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            if not self._output_ok(output_path):
                 return False, None, "创建预览失败: 输出文件未创建或为空"
             
             # 如果创建预览成功并且设置了删除原始文件选项
@@ -523,8 +1373,168 @@ class VideoConverter:
             
         except Exception as e:
             self.log(f"创建预览过程发生错误: {str(e)}")
+            if self.debug:
+                self.log(traceback.format_exc())
             return False, None, f"创建预览错误: {str(e)}"
     
+    def create_gif_preview(self, input_path, duration=6, width=480, output_path=None):
+        """
+        创建循环播放的动画预览（WebP或GIF），使用palettegen/paletteuse两遍滤镜生成调色板
+        
+        Args:
+            input_path: 输入视频文件路径
+            duration: 预览长度（秒）
+            width: 预览宽度（像素），高度按比例缩放
+            output_path: 输出文件路径，扩展名决定格式（.webp或.gif），如果为None则生成WebP
+            
+        Returns:
+            (success, output_path, message): 成功标志、输出文件路径和消息
+        """
+        if not self.ffmpeg_path:
+            return False, None, "FFmpeg不可用，无法创建预览"
+        
+        try:
+            source, source_stat = self._probe_input(input_path)
+        except (OSError, ValueError) as e:
+            return False, None, str(e)
+        
+        summary = self.get_video_summary(input_path, source_stat)
+        if not summary:
+            return False, None, "无法获取视频信息"
+        
+        video_duration = summary["duration"]
+        if video_duration <= 0:
+            return False, None, "无法确定视频时长"
+        
+        # 与create_preview相同的时长和起点选择
+        if video_duration < duration:
+            duration = max(1, video_duration - 0.5)
+        start_time = min(5, max(0, video_duration / 4)) if video_duration > duration + 10 else 0
+        
+        if not output_path:
+            output_path = str(source.with_name(f"{source.stem}_preview.webp"))
+        
+        fd, palette_path = tempfile.mkstemp(prefix="palette_", suffix=".png")
+        os.close(fd)
+        self._temp_files.append(palette_path)
+        
+        scale_filter = f"fps={PREVIEW_ANIMATION_FPS},scale={width}:-1:flags=lanczos"
+        seek_args = ["-ss", str(start_time), "-t", str(duration), "-i", input_path]
+        
+        # 第一遍：统计片段颜色生成调色板
+        palette_cmd = [
+            self.ffmpeg_path,
+            "-y",
+            "-v", "error",
+            *seek_args,
+            "-vf", f"{scale_filter},palettegen",
+            palette_path
+        ]
+        # 第二遍：使用调色板量化输出循环动画
+        render_cmd = [
+            self.ffmpeg_path,
+            "-y",
+            "-v", "error",
+            *seek_args,
+            "-i", palette_path,
+            "-lavfi", f"{scale_filter}[x];[x][1:v]paletteuse",
+            "-loop", "0",
+            output_path
+        ]
+        
+        self.log(f"创建动画预览: {source.name}")
+        self.log(f"预览位置: {start_time}s 到 {start_time + duration}s")
+        
+        try:
+            for cmd in (palette_cmd, render_cmd):
+                process = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                if process.returncode != 0:
+                    stderr = process.stderr.decode('utf-8', 'replace')
+                    self.log(f"创建动画预览失败: {stderr}")
+                    return False, None, f"创建动画预览失败: {stderr}"
+            
+            if not self._output_ok(output_path):
+                return False, None, "创建动画预览失败: 输出文件未创建或为空"
+            
+            return True, output_path, "动画预览创建成功"
+            
+        except Exception as e:
+            self.log(f"创建动画预览过程发生错误: {str(e)}")
+            if self.debug:
+                self.log(traceback.format_exc())
+            return False, None, f"创建动画预览错误: {str(e)}"
+    
+    def _build_preview_encode_cmd(self, input_path, start_time, duration, output_path):
+        """构建重新编码预览片段的命令，有可用的硬件编码器时优先使用"""
+        hw_encoder = self._detect_hw_encoder()
+        if hw_encoder:
+            video_args = ["-c:v", hw_encoder, *QUALITY_PRESETS[("medium", hw_encoder)]]  # 与软件路径的CRF 23质量相当
+            if hw_encoder in HW_ENCODER_FILTERS:
+                video_args.extend(["-vf", HW_ENCODER_FILTERS[hw_encoder]])
+        else:
+            video_args = [
+                "-c:v", "libx264",  # 视频编解码器
+                "-preset", "ultrafast",  # 使用最快的预设
+                "-crf", "23",  # 中等质量
+                "-pix_fmt", "yuv420p",  # 像素格式
+                "-color_primaries", "bt709",  # 色彩空间参数
+                "-color_trc", "bt709",       # 色彩空间参数
+                "-colorspace", "bt709",      # 色彩空间参数
+            ]
+        
+        # 重新编码时-ss放在-i之前同样是帧精确的，且无需从头解码
+        return [
+            self.ffmpeg_path,
+            "-y",  # 覆盖输出文件
+            *HW_ENCODER_INPUT_ARGS.get(hw_encoder, []),  # 硬件设备初始化参数
+            "-ss", str(start_time),  # 起始时间
+            "-i", input_path,  # 输入文件
+            "-t", str(duration),  # 持续时间
+            *video_args,  # 视频编码参数
+            "-c:a", "aac",  # 音频编解码器
+            "-b:a", "128k",  # 音频比特率
+            *self._faststart_args(output_path),  # moov atom前置
+            output_path  # 输出文件
+        ]
+    
+    def _extract_frame_pyav(self, input_path, st, time_pos, output_path):
+        """
+        使用缓存的PyAV帧提取器提取单帧，同一文件反复提取时复用已打开的容器
+        
+        Returns:
+            bool: 成功返回True，PyAV不可用或提取失败时返回False（由调用方回退到FFmpeg）
+        """
+        if av is None:
+            return False
+        
+        stamp = (st.st_mtime_ns, st.st_size)
+        try:
+            cached = self._frame_extractors.get(input_path)
+            if cached is not None and cached[0] == stamp:
+                extractor = cached[1]
+                self._frame_extractors.move_to_end(input_path)
+            else:
+                # 文件已被修改时关闭旧的提取器，重新打开
+                self._close_frame_extractor(input_path)
+                extractor = FrameExtractor(input_path)
+                self._frame_extractors[input_path] = (stamp, extractor)
+                # 超出容量时关闭最久未使用的提取器
+                while len(self._frame_extractors) > FRAME_EXTRACTOR_CACHE_SIZE:
+                    _, (_, evicted) = self._frame_extractors.popitem(last=False)
+                    evicted.close()
+            extractor.seek(time_pos).save(output_path, quality=95)
+            return True
+        except Exception as e:
+            self.log(f"PyAV提取帧失败，改用FFmpeg: {str(e)}")
+            self._close_frame_extractor(input_path)
+            return False
+    
+    def _close_frame_extractor(self, input_path):
+        """关闭并移除指定文件的缓存帧提取器（如果有）"""
+        cached = self._frame_extractors.pop(input_path, None)
+        if cached is not None:
+            cached[1].close()
+    
     def extract_frame(self, input_path, time_pos=None, output_path=None, delete_original=False):
         """
         从视频中提取单帧图像
@@ -541,30 +1551,18 @@ class VideoConverter:
         if not self.ffmpeg_path:
             return False, None, "FFmpeg不可用，无法提取帧"
         
-        if not os.path.exists(input_path):
-            return False, None, f"输入文件不存在: {input_path}"
+        try:
+            source, source_stat = self._probe_input(input_path)
+        except (OSError, ValueError) as e:
+            return False, None, str(e)
         
         # 获取视频信息
-        info = self.get_video_info(input_path)
-        if not info:
+        summary = self.get_video_summary(input_path, source_stat)
+        if not summary:
             return False, None, "无法获取视频信息"
         
         # 确定提取帧的时间位置
-        video_duration = 0
-        for stream in info.get("streams", []):
-            if stream.get("codec_type") == "video":
-                if "duration" in stream:
-                    try:
-                        video_duration = float(stream["duration"])
-                    except (ValueError, TypeError):
-                        pass
-        
-        if not video_duration:
-            # 尝试从格式信息获取
-            try:
-                video_duration = float(info.get("format", {}).get("duration", 0))
-            except (ValueError, TypeError):
-                pass
+        video_duration = summary["duration"]
         
         if video_duration <= 0:
             return False, None, "无法确定视频时长"
@@ -578,11 +1576,8 @@ class VideoConverter:
         
         # 如果未指定输出路径，则生成一个
         if not output_path:
-            dirname = os.path.dirname(input_path)
-            basename = os.path.basename(input_path)
-            name, _ = os.path.splitext(basename)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = os.path.join(dirname, f"{name}_frame_{timestamp}.jpg")
+            output_path = str(source.with_name(f"{source.stem}_frame_{timestamp}.jpg"))
         
         # 构建命令
         cmd = [
@@ -595,23 +1590,26 @@ class VideoConverter:
             output_path  # 输出文件
         ]
         
-        self.log(f"从视频提取帧: {os.path.basename(input_path)}")
+        self.log(f"从视频提取帧: {source.name}")
         self.log(f"时间位置: {time_pos:.2f}s")
         
         try:
-            # 明确指定UTF-8编码
-            process = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-            
-            if process.returncode != 0:
-                self.log(f"提取帧失败: {process.stderr}")
-                return False, None, f"提取帧失败: {process.stderr}"
+            if not self._extract_frame_pyav(input_path, source_stat, time_pos, output_path):
+                process = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                
+                if process.returncode != 0:
+                    stderr = process.stderr.decode('utf-8', 'replace')
+                    self.log(f"提取帧失败: {stderr}")
+                    return False, None, f"提取帧失败: {stderr}"
             
             # 检查输出文件是否创建成功
-            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            if not self._output_ok(output_path):
                 return False, None, "提取帧失败: 输出文件未创建或为空"
             
             # 如果提取成功并且设置了删除原始文件选项
             if delete_original:
+                # 先关闭仍打开该文件的帧提取器（Windows下打开的文件无法删除）
+                self._close_frame_extractor(input_path)
                 try:
                     os.remove(input_path)
                     self.log(f"已删除原始文件: {input_path}")
@@ -623,4 +1621,119 @@ class VideoConverter:
             
         except Exception as e:
             self.log(f"提取帧过程发生错误: {str(e)}")
-            return False, None, f"提取帧错误: {str(e)}"
\ No newline at end of file
+            if self.debug:
+                self.log(traceback.format_exc())
+            return False, None, f"提取帧错误: {str(e)}"
+    
+    def extract_frames_batch(self, input_path, timestamps, output_dir=None, width=320):
+        """
+        使用单个FFmpeg进程从视频中批量提取多帧缩略图
+        
+        Args:
+            input_path: 输入视频文件路径
+            timestamps: 提取帧的时间位置列表（秒），可以无序或重复
+            output_dir: 输出目录，如果为None则在视频所在目录下生成
+            width: 缩略图宽度，高度按比例缩放 (默认: 320)
+            
+        Returns:
+            (success, frames, message): 成功标志、{请求的时间位置: 输出图像路径} 字典和消息；
+            间隔小于一帧的时间位置对应同一个图像，没有对应帧的时间位置不在字典中
+        """
+        if not self.ffmpeg_path:
+            return False, {}, "FFmpeg不可用，无法提取帧"
+        
+        try:
+            source, source_stat = self._probe_input(input_path)
+        except (OSError, ValueError) as e:
+            return False, {}, str(e)
+        
+        # 获取视频信息
+        summary = self.get_video_summary(input_path, source_stat)
+        if not summary:
+            return False, {}, "无法获取视频信息"
+        
+        video_duration = summary["duration"]
+        if video_duration <= 0:
+            return False, {}, "无法确定视频时长"
+        
+        # 限制在视频范围内，排序并去重，保留请求的时间位置到实际时间位置的对应关系
+        requested = {t: max(0, min(t, video_duration - 0.1)) for t in timestamps}
+        timestamps = sorted(set(requested.values()))
+        if not timestamps:
+            return False, {}, "未指定提取帧的时间位置"
+        
+        # 如果未指定输出目录，则生成一个
+        if not output_dir:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_dir = str(source.with_name(f"{source.stem}_frames_{timestamp}"))
+        
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+        except Exception as e:
+            return False, {}, f"无法创建输出目录: {str(e)}"
+        
+        # 先快速定位到第一个时间点前1秒，避免从头解码；定位后时间戳从0开始
+        seek = max(0, timestamps[0] - 1)
+        
+        # 每个时间点选取第一个 t >= 该时间点 的帧（间隔小于一帧的时间点会选中同一帧）
+        targets = [round(t - seek, 3) for t in timestamps]
+        select_expr = "+".join(
+            f"gte(t,{target:.3f})*(isnan(prev_selected_t)+lt(prev_selected_t,{target:.3f}))"
+            for target in targets
+        )
+        
+        output_pattern = os.path.join(output_dir, "frame_%03d.jpg")
+        cmd = [
+            self.ffmpeg_path,
+            "-y",  # 覆盖输出文件
+            "-ss", str(seek),  # 起始位置
+            "-i", input_path,  # 输入文件
+            "-vf", f"select='gt({select_expr},0)',showinfo,scale={width}:-2",  # 选帧并缩放，showinfo输出选中帧的时间
+            "-vsync", "vfr",  # 只输出被选中的帧
+            "-q:v", "3",  # 缩略图质量
+            output_pattern  # 输出文件
+        ]
+        
+        self.log(f"从视频批量提取 {len(timestamps)} 个时间位置的帧: {source.name}")
+        
+        try:
+            process = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            
+            if process.returncode != 0:
+                stderr = process.stderr.decode('utf-8', 'replace')
+                self.log(f"批量提取帧失败: {stderr}")
+                return False, {}, f"批量提取帧失败: {stderr}"
+            
+            # showinfo按输出顺序为每个选中帧输出一行，第n行对应第n个图像
+            frame_times = [
+                float(line.split(b"pts_time:", 1)[1].split(None, 1)[0])
+                for line in process.stderr.splitlines()
+                if b"Parsed_showinfo" in line and b"pts_time:" in line
+            ]
+            
+            # 每个时间点对应第一个不早于它的选中帧
+            frame_paths = {}
+            frame_index = 0
+            for t, target in zip(timestamps, targets):
+                while frame_index < len(frame_times) and frame_times[frame_index] < target - 1e-6:
+                    frame_index += 1
+                if frame_index < len(frame_times):
+                    path = output_pattern % (frame_index + 1)
+                    if self._output_ok(path):
+                        frame_paths[t] = path
+            
+            frames = {t: frame_paths[actual] for t, actual in requested.items() if actual in frame_paths}
+            missing = [t for t in requested if t not in frames]
+            if missing:
+                self.log(f"以下时间位置没有提取到帧: {', '.join(f'{t:.3f}s' for t in missing)}")
+            
+            if not frames:
+                return False, {}, "批量提取帧失败: 未生成任何图像"
+            
+            return True, frames, f"成功提取 {len(set(frame_paths.values()))} 帧，对应 {len(frames)} 个时间位置"
+            
+        except Exception as e:
+            self.log(f"批量提取帧过程发生错误: {str(e)}")
+            if self.debug:
+                self.log(traceback.format_exc())
+            return False, {}, f"批量提取帧错误: {str(e)}"
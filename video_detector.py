@@ -4,7 +4,6 @@
 使用基于规则的检测方法，支持递归处理子文件夹，支持删除原文件
 """
 import os
-import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, messagebox
 import threading
@@ -13,23 +12,12 @@ import subprocess
 import json
 import tempfile
 import time
-from datetime import timedelta
 import traceback
-import platform
 import shutil
-import locale
-
-# 设置控制台输出编码
-if sys.platform == 'win32':
-    # Windows平台设置控制台编码为UTF-8
-    try:
-        # 获取当前编码
-        system_encoding = locale.getpreferredencoding()
-        # 设置标准输出和标准错误的编码
-        sys.stdout.reconfigure(encoding='utf-8')
-        sys.stderr.reconfigure(encoding='utf-8')
-    except Exception:
-        pass
+import functools
+import shelve
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 常见视频编解码器映射表
 VIDEO_CODEC_MAP = {
@@ -62,6 +50,199 @@ AUDIO_CODEC_MAP = {
     'pcm_s16le': 'pcm_s16le',  # WAV
 }
 
+# 可能导致MoviePy不兼容的视频编码
+PROBLEM_VIDEO_CODECS = frozenset({'hevc', 'h265', 'av1', 'vp9'})
+
+# MoviePy兼容的像素格式
+OK_PIXEL_FORMATS = frozenset({'yuv420p', 'yuvj420p', 'rgb24', 'bgr24'})
+
+# MoviePy兼容的色彩空间
+OK_COLOR_SPACES = frozenset({'bt709', 'bt601', 'bt470bg', 'smpte170m'})
+
+# MoviePy兼容的音频编码
+OK_AUDIO_CODECS = frozenset({'aac', 'mp3', 'pcm_s16le'})
+
+# 需要检测的视频文件扩展名
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.mkv', '.mov', '.avi', '.webm', '.flv', '.ts', '.m4v', '.wmv', '.mpg', '.mpeg'})
+
+# 小于该大小（字节）的文件视为空文件或仍在写入，不做检测
+MIN_VIDEO_FILE_SIZE = 1024
+
+# 文件大小显示单位（每级相差1024倍）
+FILESIZE_UNITS = ('B', 'KB', 'MB', 'GB')
+
+# 并行检测的最大线程数（每个线程同时只运行一个ffprobe进程）
+DETECT_MAX_WORKERS = 8
+
+# 批量修复时每个ffmpeg进程分配的CPU核心数，并行进程数 = CPU核心数 // FIX_CORES_PER_JOB
+FIX_CORES_PER_JOB = 4
+
+# 覆盖批量修复并行进程数和每个ffmpeg线程数的环境变量
+FFMPEG_WORKERS_ENV = 'VIDEO_DETECTOR_FFMPEG_WORKERS'
+FFMPEG_THREADS_ENV = 'VIDEO_DETECTOR_FFMPEG_THREADS'
+
+# 修复视频时优先使用的硬件H.264编码器（按优先级排列）
+HW_H264_ENCODERS = ('h264_nvenc', 'h264_videotoolbox', 'h264_qsv')
+
+# 硬件编码器各质量等级的参数（与libx264的CRF 18/23/28大致相当）
+HW_ENCODER_QUALITY_ARGS = {
+    'h264_nvenc': {
+        'high': ['-preset', 'p6', '-rc', 'vbr', '-cq', '19', '-b:v', '0'],
+        'medium': ['-preset', 'p4', '-rc', 'vbr', '-cq', '23', '-b:v', '0'],
+        'low': ['-preset', 'p1', '-rc', 'vbr', '-cq', '28', '-b:v', '0'],
+    },
+    'h264_videotoolbox': {
+        'high': ['-q:v', '70'],
+        'medium': ['-q:v', '60'],
+        'low': ['-q:v', '45'],
+    },
+    'h264_qsv': {
+        'high': ['-preset', 'slow', '-global_quality', '20'],
+        'medium': ['-preset', 'medium', '-global_quality', '23'],
+        'low': ['-preset', 'veryfast', '-global_quality', '28'],
+    },
+}
+
+# 硬件编码器要求的输入像素格式（未列出的使用yuv420p）
+HW_ENCODER_PIX_FMTS = {'h264_qsv': 'nv12'}
+
+# 修复时输出进度日志的最小间隔（秒）
+PROGRESS_LOG_INTERVAL = 2.0
+
+# GUI从日志队列取消息的间隔（毫秒）
+LOG_POLL_INTERVAL_MS = 30
+
+# GUI从界面更新队列取更新的间隔（毫秒）
+UI_POLL_INTERVAL_MS = 50
+
+# 文件列表在可见行之外额外挂载的行数（树形视图只包含可见范围内的行）
+TREE_OVERSCAN_ROWS = 2
+
+# 鼠标滚轮每格滚动的行数
+TREE_WHEEL_ROWS = 3
+
+# 日志文本框保留的最大行数，超出时删除最早的行
+LOG_MAX_LINES = 5000
+
+# Windows下启动ffprobe/ffmpeg时不创建控制台窗口（避免窗口闪烁和每个子进程的控制台分配开销）
+SUBPROCESS_FLAGS = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+
+# 启动ffprobe/ffmpeg的额外参数，降低每个进程的启动开销：
+# POSIX下close_fds=False使subprocess可以走posix_spawn快速路径（Python创建的文件描述符默认不可继承）；
+# Windows仍需close_fds=True，避免并行检测/修复时管道句柄被其他子进程继承
+SPAWN_KWARGS = {"creationflags": SUBPROCESS_FLAGS, "close_fds": os.name == 'nt'}
+
+# ffprobe结果的磁盘缓存路径（按文件路径缓存，文件大小或修改时间变化时失效）
+PROBE_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.video_detector_cache')
+
+# 磁盘缓存最多保留的条目数，超出时打开缓存时删除修改时间最早的文件的条目
+PROBE_CACHE_MAX_ENTRIES = 5000
+
+@functools.lru_cache(maxsize=8)
+def _which(name):
+    """在PATH中查找可执行文件（进程内遍历PATH，无需启动where/which子进程，结果缓存）"""
+    return shutil.which(name)
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_frame_rate(fps_str):
+    """
+    解析ffprobe的帧率字符串（如 "30000/1001"），同一设备拍摄的文件帧率字符串大量重复，结果缓存
+    
+    Returns:
+        float: 保留两位小数的帧率，无法解析时返回None
+    """
+    num_s, sep, den_s = fps_str.partition("/")
+    if not sep:
+        return None
+    try:
+        den = int(den_s)
+        return round(int(num_s) / den, 2) if den else None
+    except ValueError:
+        return None
+
+
+def _iter_video_files(root, recursive=True):
+    """
+    遍历目录中的视频文件，复用os.scandir返回的目录项信息，不再逐个文件调用stat
+    
+    Args:
+        root: 目录路径
+        recursive: 是否包含子文件夹
+        
+    Yields:
+        (path, size): 视频文件路径和文件大小（字节）
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                stack.append(entry.path)
+                            continue
+                        # 直接切出扩展名（以点开头的隐藏文件没有扩展名，与os.path.splitext一致）
+                        name = entry.name
+                        dot = name.rfind('.')
+                        if dot > 0 and name[dot:].lower() in VIDEO_EXTENSIONS and entry.is_file():
+                            size = entry.stat().st_size
+                            if size >= MIN_VIDEO_FILE_SIZE:
+                                yield entry.path, size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+@functools.lru_cache(maxsize=1024)
+def _real_dir(directory):
+    """解析目录的真实路径（同一文件夹中的文件共用结果，不必逐个文件解析每级路径）"""
+    return os.path.realpath(directory)
+
+
+def _canonical_path(path):
+    """
+    生成用于判断重复文件的规范路径：解析符号链接，并在Windows下忽略大小写和斜杠差异
+    
+    Args:
+        path: 文件路径
+        
+    Returns:
+        str: 规范化后的路径
+    """
+    if os.path.islink(path):
+        real = os.path.realpath(path)
+    else:
+        directory, name = os.path.split(os.path.abspath(path))
+        real = os.path.join(_real_dir(directory), name)
+    return os.path.normcase(real)
+
+
+def _env_int(name):
+    """读取正整数环境变量，未设置或无效时返回None"""
+    try:
+        value = int(os.environ.get(name, ''))
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+def _fix_pool_size():
+    """
+    计算批量修复的并行进程数和每个ffmpeg进程的线程数，避免多个ffmpeg各自按全部核心开线程导致CPU超额订阅
+    
+    Returns:
+        (workers, threads): 并行修复的进程数和每个ffmpeg的-threads值
+    """
+    cpu_count = os.cpu_count() or 4
+    workers = _env_int(FFMPEG_WORKERS_ENV) or max(1, cpu_count // FIX_CORES_PER_JOB)
+    threads = _env_int(FFMPEG_THREADS_ENV) or max(1, cpu_count // workers)
+    return workers, threads
+
+
 class VideoInfo:
     """存储视频文件信息的类"""
     
@@ -71,10 +252,27 @@ class VideoInfo:
     STATUS_FIXED = "已修复"
     STATUS_PROCESSING = "处理中"
     
-    def __init__(self, filepath):
+    # 各状态在文件列表中使用的行标签
+    STATUS_TAGS = {
+        STATUS_OK: "ok",
+        STATUS_ERROR: "error",
+        STATUS_FIXED: "fixed",
+        STATUS_UNKNOWN: "unknown",
+        STATUS_PROCESSING: "processing"
+    }
+    
+    STATUS_COLORS = {
+        STATUS_OK: "green",
+        STATUS_ERROR: "red",
+        STATUS_FIXED: "blue",
+        STATUS_UNKNOWN: "black",
+        STATUS_PROCESSING: "orange"
+    }
+    
+    def __init__(self, filepath, filesize=None):
         self.filepath = filepath  # 文件路径
         self.filename = os.path.basename(filepath)  # 文件名
-        self.filesize = os.path.getsize(filepath)  # 文件大小(字节)
+        self.filesize = filesize if filesize is not None else os.path.getsize(filepath)  # 文件大小(字节)
         self.status = self.STATUS_UNKNOWN  # 状态
         self.width = None  # 宽度
         self.height = None  # 高度
@@ -86,20 +284,20 @@ class VideoInfo:
         self.audio_bitrate = None  # 音频比特率
         self.error_message = None  # 错误信息
         self.fixed_path = None  # 修复后的文件路径
+        self.suffixed_output_path = None  # 不保持原文件名时的修复输出路径（首次使用时生成）
         self.fixed_time = None  # 修复时间
         self.conversion_params = None  # 转换参数
         self.pixel_format = None  # 像素格式
         self.color_space = None  # 色彩空间
         self.issues = []  # 视频问题列表
+        self._summary = None  # get_summary的缓存结果
+        self._summary_key = None  # 生成缓存结果时的字段值
     
     def format_filesize(self):
-        """格式化文件大小为易读格式"""
-        size = self.filesize
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024.0 or unit == 'GB':
-                break
-            size /= 1024.0
-        return f"{size:.2f} {unit}"
+        """格式化文件大小为易读格式（由bit_length直接算出单位，无需循环相除）"""
+        size = int(self.filesize)
+        i = min(3, (size.bit_length() - 1) // 10) if size > 0 else 0
+        return f"{size / (1 << (i * 10)):.2f} {FILESIZE_UNITS[i]}"
     
     def format_duration(self):
         """格式化时长为易读格式"""
@@ -121,87 +319,91 @@ class VideoInfo:
         return f"{self.width}x{self.height}"
     
     def get_summary(self):
-        """获取视频信息摘要"""
-        status_color = {
-            self.STATUS_OK: "green",
-            self.STATUS_ERROR: "red",
-            self.STATUS_FIXED: "blue",
-            self.STATUS_UNKNOWN: "black",
-            self.STATUS_PROCESSING: "orange"
-        }
-        
-        return {
-            "filename": self.filename,
-            "status": self.status,
-            "status_color": status_color.get(self.status, "black"),
-            "size": self.format_filesize(),
-            "resolution": self.get_resolution_str(),
-            "duration": self.format_duration(),
-            "codec": self.codec or "未知"
-        }
+        """获取视频信息摘要（相关字段未变化时返回缓存结果，调用方不应修改返回的字典）"""
+        key = (self.filename, self.status, self.filesize, self.width, self.height, self.duration, self.codec)
+        if key != self._summary_key:
+            self._summary_key = key
+            self._summary = {
+                "filename": self.filename,
+                "status": self.status,
+                "status_color": self.STATUS_COLORS.get(self.status, "black"),
+                "size": self.format_filesize(),
+                "resolution": self.get_resolution_str(),
+                "duration": self.format_duration(),
+                "codec": self.codec or "未知"
+            }
+        return self._summary
     
     def get_details(self):
         """获取详细信息文本"""
-        details = []
-        details.append(f"文件名: {self.filename}")
-        details.append(f"状态: {self.status}")
-        details.append(f"文件大小: {self.format_filesize()}")
-        details.append(f"路径: {self.filepath}")
+        return "\n".join(self._iter_detail_lines())
+    
+    def _iter_detail_lines(self):
+        """逐行生成详细信息，只输出有值的字段"""
+        yield f"文件名: {self.filename}"
+        yield f"状态: {self.status}"
+        yield f"文件大小: {self.format_filesize()}"
+        yield f"路径: {self.filepath}"
         
         if self.width and self.height:
-            details.append(f"分辨率: {self.width}x{self.height}")
+            yield f"分辨率: {self.width}x{self.height}"
         
         if self.duration is not None:
-            details.append(f"时长: {self.format_duration()}")
+            yield f"时长: {self.format_duration()}"
         
         if self.fps:
-            details.append(f"帧率: {self.fps} FPS")
+            yield f"帧率: {self.fps} FPS"
         
         if self.codec:
-            details.append(f"视频编码: {self.codec}")
+            yield f"视频编码: {self.codec}"
         
         if self.pixel_format:
-            details.append(f"像素格式: {self.pixel_format}")
+            yield f"像素格式: {self.pixel_format}"
         
         if self.color_space:
-            details.append(f"色彩空间: {self.color_space}")
+            yield f"色彩空间: {self.color_space}"
         
         if self.video_bitrate:
-            details.append(f"视频比特率: {self.video_bitrate}")
+            yield f"视频比特率: {self.video_bitrate}"
         
         if self.audio_codec:
-            details.append(f"音频编码: {self.audio_codec}")
+            yield f"音频编码: {self.audio_codec}"
             
         if self.audio_bitrate:
-            details.append(f"音频比特率: {self.audio_bitrate}")
+            yield f"音频比特率: {self.audio_bitrate}"
         
         if self.issues:
-            details.append("")
-            details.append("检测到的问题:")
+            yield ""
+            yield "检测到的问题:"
             for issue in self.issues:
-                details.append(f"- {issue}")
+                yield f"- {issue}"
         
         if self.error_message:
-            details.append(f"\n错误信息: {self.error_message}")
+            yield f"\n错误信息: {self.error_message}"
         
         if self.fixed_path:
-            details.append(f"\n修复文件: {os.path.basename(self.fixed_path)}")
-            details.append(f"修复路径: {self.fixed_path}")
+            yield f"\n修复文件: {os.path.basename(self.fixed_path)}"
+            yield f"修复路径: {self.fixed_path}"
             
             if self.fixed_time:
-                details.append(f"修复时间: {self.fixed_time}")
+                yield f"修复时间: {self.fixed_time}"
             
             if self.conversion_params:
-                details.append(f"转换参数: {self.conversion_params}")
-        
-        return "\n".join(details)
+                yield f"转换参数: {self.conversion_params}"
 
 
 class VideoDetector:
     """视频检测器类，用于检测和修复视频"""
     
-    def __init__(self):
-        """初始化视频检测器"""
+    def __init__(self, use_cache=True, debug=False):
+        """
+        初始化视频检测器
+        
+        Args:
+            use_cache: 是否使用ffprobe结果的磁盘缓存 (默认: True)
+            debug: 出错时是否将完整的异常堆栈写入日志 (默认: False)
+        """
+        self.debug = debug
         self.ffmpeg_path = self._find_executable('ffmpeg')
         self.ffprobe_path = self._find_executable('ffprobe')
         self.has_ffmpeg = self.ffmpeg_path is not None
@@ -209,29 +411,55 @@ class VideoDetector:
         
         # 临时文件列表，用于清理
         self._temp_files = []
+        
+        # 硬件编码器探测结果，None表示尚未探测，空字符串表示没有可用的硬件编码器
+        self._hw_encoder = None
+        self._hw_lock = threading.Lock()
+        
+        # ffprobe结果缓存 {绝对路径: ((文件大小, 修改时间ns), ffprobe数据)}，并行检测时需加锁访问
+        self._cache_lock = threading.Lock()
+        self._probe_cache = None
+        if use_cache:
+            try:
+                self._probe_cache = shelve.open(PROBE_CACHE_PATH)
+                self._prune_probe_cache()
+            except Exception as e:
+                print(f"无法打开元数据缓存，已禁用缓存: {e}")
+                self.close()
+    
+    def _prune_probe_cache(self):
+        """删除缓存中文件已不存在或已被修改的条目，条目数超过PROBE_CACHE_MAX_ENTRIES时删除最旧的条目"""
+        cache = self._probe_cache
+        valid = []
+        stale = []
+        for key in list(cache.keys()):
+            try:
+                stamp = cache[key][0]
+                st = os.stat(key)
+            except Exception:
+                stale.append(key)
+                continue
+            if stamp == (st.st_size, st.st_mtime_ns):
+                valid.append((stamp[1], key))
+            else:
+                stale.append(key)
+        
+        if len(valid) > PROBE_CACHE_MAX_ENTRIES:
+            valid.sort()
+            stale.extend(key for _, key in valid[:len(valid) - PROBE_CACHE_MAX_ENTRIES])
+        
+        for key in stale:
+            del cache[key]
+        if stale:
+            # gdbm删除条目后不会自动回收磁盘空间
+            reorganize = getattr(cache.dict, 'reorganize', None)
+            if reorganize:
+                reorganize()
+            cache.sync()
     
     def _find_executable(self, name):
         """查找系统中的可执行文件路径"""
-        try:
-            if platform.system() == "Windows":
-                result = subprocess.run(["where", name], 
-                                      capture_output=True, 
-                                      text=True, 
-                                      encoding='utf-8')
-            else:
-                result = subprocess.run(["which", name], 
-                                      capture_output=True, 
-                                      text=True,
-                                      encoding='utf-8')
-                
-            if result.returncode == 0:
-                paths = result.stdout.strip().split('\n')
-                if paths:
-                    return paths[0]
-        except Exception:
-            pass
-        
-        return None
+        return _which(name)
     
     def cleanup(self):
         """清理临时文件"""
@@ -243,6 +471,29 @@ class VideoDetector:
                 pass
         self._temp_files = []
     
+    def clear_probe_cache(self):
+        """清空ffprobe结果缓存"""
+        with self._cache_lock:
+            if self._probe_cache is None:
+                return
+            self._probe_cache.clear()
+            self._probe_cache.sync()
+    
+    def sync_probe_cache(self):
+        """将ffprobe结果缓存写入磁盘"""
+        with self._cache_lock:
+            if self._probe_cache is None:
+                return
+            self._probe_cache.sync()
+    
+    def close(self):
+        """关闭ffprobe结果缓存"""
+        with self._cache_lock:
+            if self._probe_cache is None:
+                return
+            self._probe_cache.close()
+            self._probe_cache = None
+    
     def detect_video(self, video_path, callback=None):
         """
         检测视频文件，返回视频信息
@@ -266,11 +517,20 @@ class VideoDetector:
         
         info = VideoInfo(video_path)
         
+        # 过小的文件无需启动ffprobe（扩展名只在扫描文件夹时过滤，用户明确选择的文件交给ffprobe判断）
+        if info.filesize < MIN_VIDEO_FILE_SIZE:
+            log(f"跳过: 文件为空或仍在写入 - {info.filename}")
+            info.status = VideoInfo.STATUS_ERROR
+            info.error_message = "文件为空或仍在写入"
+            return info
+        
         # 使用ffprobe获取视频信息
         if self.has_ffprobe:
             log(f"使用FFprobe检测视频: {os.path.basename(video_path)}")
             try:
-                video_info = self._get_video_info(video_path)
+                # 一次ffprobe调用同时得到视频信息和问题检测所需的数据
+                data = self._probe_raw(video_path)
+                video_info = self._extract_info(data)
                 if video_info:
                     # 更新VideoInfo对象
                     for key, value in video_info.items():
@@ -278,7 +538,7 @@ class VideoDetector:
                             setattr(info, key, value)
                     
                     # 识别问题流
-                    issues = self._identify_problematic_streams(video_path)
+                    issues = self._issues_from_data(data)
                     if issues:
                         info.issues = issues["video_issues"] + issues["audio_issues"]
                         
@@ -311,14 +571,110 @@ class VideoDetector:
         
         return info
     
-    def _get_video_info(self, video_path):
-        """使用ffprobe获取视频详细信息"""
-        if not self.has_ffprobe:
-            return None
+    def detect_videos_batch(self, video_paths, callback=None, on_result=None, max_workers=None):
+        """
+        使用线程池并行检测多个视频文件
+        
+        Args:
+            video_paths: 视频文件路径列表
+            callback: 可选的回调函数，用于日志记录（会在多个线程中调用）
+            on_result: 可选的回调函数 on_result(index, info)，每个文件检测完成时按完成顺序调用
+            max_workers: 最大并行数，None表示 min(CPU核心数, DETECT_MAX_WORKERS)，不超过文件数
+            
+        Returns:
+            list: 与输入顺序一致的VideoInfo列表（检测失败的项为None）
+        """
+        results = [None] * len(video_paths)
+        if not video_paths:
+            return results
+        
+        max_workers = min(max_workers or min(os.cpu_count() or 1, DETECT_MAX_WORKERS), len(video_paths))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.detect_video, path, callback): i
+                for i, path in enumerate(video_paths)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    if callback:
+                        callback(f"检测失败: {os.path.basename(video_paths[i])} - {str(e)}")
+                if on_result:
+                    on_result(i, results[i])
+        
+        self.sync_probe_cache()
+        return results
+    
+    def fix_videos_batch(self, jobs, quality='medium', delete_original=False, callback=None, on_result=None,
+                         verify=False):
+        """
+        使用有界线程池并行修复多个视频，每个ffmpeg进程限制线程数
+        
+        Args:
+            jobs: (video_info, output_path) 列表，output_path为None时替换原文件
+            quality: 转码质量，可选'low'、'medium'、'high'
+            delete_original: 传递给fix_video的删除原文件设置
+            callback: 可选的回调函数，用于日志记录（会在多个线程中调用，消息前带文件名）
+            on_result: 可选的回调函数 on_result(index, success, message)，每个文件修复完成时按完成顺序调用
+            verify: 是否在修复后用ffprobe重新检测输出文件 (默认: False)
+            
+        Returns:
+            list: 与输入顺序一致的 (success, message) 列表
+        """
+        results = [(False, "未修复")] * len(jobs)
+        if not jobs:
+            return results
+        
+        workers, threads = _fix_pool_size()
+        if callback:
+            callback(f"并行修复: {workers} 个进程, 每个ffmpeg {threads} 个线程")
+        
+        def job_log(name):
+            return (lambda msg: callback(f"[{name}] {msg}")) if callback else None
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.fix_video, info, output_path, quality, delete_original,
+                                job_log(info.filename), verify, threads): i
+                for i, (info, output_path) in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = (False, f"转换错误: {str(e)}")
+                if on_result:
+                    on_result(i, *results[i])
+        
+        return results
+    
+    def _probe_raw(self, video_path):
+        """
+        运行一次ffprobe，返回解析后的JSON（包含format、streams及流的side_data_list）
+        
+        Args:
+            video_path: 视频文件路径
+            
+        Returns:
+            dict: ffprobe输出的JSON数据
+        """
+        # 缓存命中时无需启动ffprobe
+        key = os.path.abspath(video_path)
+        st = os.stat(video_path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        # close()可能在其他线程中把缓存置为None，需在锁内检查
+        with self._cache_lock:
+            cached = self._probe_cache.get(key) if self._probe_cache is not None else None
+        if cached and cached[0] == stamp:
+            return cached[1]
         
         cmd = [
             self.ffprobe_path,
             "-v", "quiet",
+            "-threads", "1",  # 并行检测时避免多个ffprobe的内部线程超额占用CPU
             "-print_format", "json",
             "-show_format",
             "-show_streams",
@@ -326,159 +682,367 @@ class VideoDetector:
         ]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
+            # 直接读取字节，json.loads可以解析UTF-8字节，stderr只在出错时解码
+            result = subprocess.run(cmd, capture_output=True, **SPAWN_KWARGS)
             if result.returncode != 0:
-                raise Exception(f"FFprobe执行失败: {result.stderr}")
+                raise Exception(f"FFprobe执行失败: {result.stderr.decode('utf-8', errors='replace')}")
             
             data = json.loads(result.stdout)
-            info = {}
-            
-            # 查找视频流和音频流
-            video_stream = None
-            audio_stream = None
+            with self._cache_lock:
+                if self._probe_cache is not None:
+                    self._probe_cache[key] = (stamp, data)
+            return data
             
-            for stream in data.get("streams", []):
-                if stream.get("codec_type") == "video" and not video_stream:
-                    video_stream = stream
-                elif stream.get("codec_type") == "audio" and not audio_stream:
-                    audio_stream = stream
+        except json.JSONDecodeError as e:
+            raise Exception(f"无法解析FFprobe输出: {e}")
+        except Exception as e:
+            raise Exception(f"获取视频信息时出错: {e}")
+    
+    @staticmethod
+    def _first_streams(data):
+        """返回第一个视频流和第一个音频流"""
+        video_stream = None
+        audio_stream = None
+        
+        for stream in data.get("streams", []):
+            if stream.get("codec_type") == "video" and not video_stream:
+                video_stream = stream
+            elif stream.get("codec_type") == "audio" and not audio_stream:
+                audio_stream = stream
+        
+        return video_stream, audio_stream
+    
+    def _extract_info(self, data):
+        """
+        从ffprobe数据中提取视频信息
+        
+        Args:
+            data: _probe_raw返回的JSON数据
             
-            # 提取视频信息
-            if video_stream:
-                info['width'] = int(video_stream.get("width", 0))
-                info['height'] = int(video_stream.get("height", 0))
-                info['codec'] = video_stream.get("codec_name")
-                info['pixel_format'] = video_stream.get("pix_fmt")
-                info['color_space'] = video_stream.get("color_space")
-                
-                # 处理帧率
-                fps_str = video_stream.get("r_frame_rate", "")
-                if fps_str and "/" in fps_str:
-                    num, denom = map(int, fps_str.split("/"))
-                    if denom != 0:
-                        info['fps'] = round(num / denom, 2)
-                
-                # 视频比特率
-                if "bit_rate" in video_stream:
-                    try:
-                        bitrate = int(video_stream["bit_rate"]) / 1000
-                        info['video_bitrate'] = f"{bitrate:.0f} kbps"
-                    except (ValueError, TypeError):
-                        pass
+        Returns:
+            dict: 可直接赋值给VideoInfo属性的信息字典
+        """
+        info = {}
+        
+        # 查找视频流和音频流
+        video_stream, audio_stream = self._first_streams(data)
+        
+        # 提取视频信息
+        if video_stream:
+            info['width'] = int(video_stream.get("width", 0))
+            info['height'] = int(video_stream.get("height", 0))
+            info['codec'] = video_stream.get("codec_name")
+            info['pixel_format'] = video_stream.get("pix_fmt")
+            info['color_space'] = video_stream.get("color_space")
             
-            # 提取音频信息
-            if audio_stream:
-                info['audio_codec'] = audio_stream.get("codec_name")
-                
-                if "bit_rate" in audio_stream:
-                    try:
-                        bitrate = int(audio_stream["bit_rate"]) / 1000
-                        info['audio_bitrate'] = f"{bitrate:.0f} kbps"
-                    except (ValueError, TypeError):
-                        pass
+            # 处理帧率
+            fps = _parse_frame_rate(video_stream.get("r_frame_rate", ""))
+            if fps is not None:
+                info['fps'] = fps
             
-            # 提取格式信息
-            format_info = data.get("format", {})
-            if "duration" in format_info:
+            # 视频比特率
+            if "bit_rate" in video_stream:
                 try:
-                    info['duration'] = float(format_info["duration"])
+                    bitrate = int(video_stream["bit_rate"]) / 1000
+                    info['video_bitrate'] = f"{bitrate:.0f} kbps"
                 except (ValueError, TypeError):
                     pass
+        
+        # 提取音频信息
+        if audio_stream:
+            info['audio_codec'] = audio_stream.get("codec_name")
             
-            return info
-            
-        except json.JSONDecodeError as e:
-            raise Exception(f"无法解析FFprobe输出: {e}")
-        except Exception as e:
-            raise Exception(f"获取视频信息时出错: {e}")
+            if "bit_rate" in audio_stream:
+                try:
+                    bitrate = int(audio_stream["bit_rate"]) / 1000
+                    info['audio_bitrate'] = f"{bitrate:.0f} kbps"
+                except (ValueError, TypeError):
+                    pass
+        
+        # 提取格式信息
+        format_info = data.get("format", {})
+        if "duration" in format_info:
+            try:
+                info['duration'] = float(format_info["duration"])
+            except (ValueError, TypeError):
+                pass
+        
+        return info
     
-    def _identify_problematic_streams(self, input_path):
+    def _issues_from_data(self, data):
         """
-        识别可能导致MoviePy不兼容的视频流
+        根据ffprobe数据识别可能导致MoviePy不兼容的视频流
         
         Args:
-            input_path: 输入视频文件路径
+            data: _probe_raw返回的JSON数据
             
         Returns:
             dict: 包含问题流的字典 {'video_issues': [...], 'audio_issues': [...]}
         """
         result = {"video_issues": [], "audio_issues": []}
         
-        if not self.has_ffprobe:
+        # 只检查第一个视频流和第一个音频流（MoviePy只读取这两个流，其余流不影响兼容性）
+        video_stream, audio_stream = self._first_streams(data)
+        
+        # 常见情况：各项属性都兼容且没有side data时直接返回，无需逐项生成问题描述
+        video_ok = not video_stream or (
+            video_stream.get("codec_name", "").lower() not in PROBLEM_VIDEO_CODECS
+            and video_stream.get("pix_fmt", "").lower() in OK_PIXEL_FORMATS
+            and (not video_stream.get("color_space") or video_stream["color_space"].lower() in OK_COLOR_SPACES)
+            and not video_stream.get("side_data_list")
+        )
+        audio_ok = not audio_stream or audio_stream.get("codec_name", "").lower() in OK_AUDIO_CODECS
+        if video_ok and audio_ok:
             return result
         
-        try:
-            video_info = self._get_video_info(input_path)
-            if not video_info:
-                return result
-            
-            # 获取完整的视频流信息，包括side data信息
-            cmd = [
-                self.ffprobe_path,
-                "-v", "quiet",
-                "-print_format", "json",
-                "-show_format",
-                "-show_streams",
-                "-show_data",
-                input_path
-            ]
-            
-            proc_result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-            if proc_result.returncode != 0:
-                return result
+        for stream in (video_stream, audio_stream):
+            if not stream:
+                continue
             
-            data = json.loads(proc_result.stdout)
-            
-            # 检查视频流
-            for stream in data.get("streams", []):
-                if stream.get("codec_type") == "video":
-                    codec_name = stream.get("codec_name", "").lower()
-                    
-                    # 检查可能导致问题的编解码器
-                    if codec_name in ["hevc", "h265", "av1", "vp9"]:
-                        result["video_issues"].append(
-                            f"视频使用 {codec_name.upper()} 编码，可能不被MoviePy兼容"
-                        )
-                    
-                    # 检查像素格式
-                    pix_fmt = stream.get("pix_fmt", "").lower()
-                    if pix_fmt and pix_fmt not in ["yuv420p", "yuvj420p", "rgb24", "bgr24"]:
-                        result["video_issues"].append(
-                            f"视频使用 {pix_fmt} 像素格式，可能不被MoviePy兼容"
-                        )
-                    
-                    # 检查色彩空间
-                    color_space = stream.get("color_space", "").lower()
-                    if color_space and color_space not in ["bt709", "bt601", "bt470bg", "smpte170m"]:
+            if stream.get("codec_type") == "video":
+                codec_name = stream.get("codec_name", "").lower()
+                
+                # 检查可能导致问题的编解码器
+                if codec_name in PROBLEM_VIDEO_CODECS:
+                    result["video_issues"].append(
+                        f"视频使用 {codec_name.upper()} 编码，可能不被MoviePy兼容"
+                    )
+                
+                # 检查像素格式
+                pix_fmt = stream.get("pix_fmt", "").lower()
+                if pix_fmt and pix_fmt not in OK_PIXEL_FORMATS:
+                    result["video_issues"].append(
+                        f"视频使用 {pix_fmt} 像素格式，可能不被MoviePy兼容"
+                    )
+                
+                # 检查色彩空间
+                color_space = stream.get("color_space", "").lower()
+                if color_space and color_space not in OK_COLOR_SPACES:
+                    result["video_issues"].append(
+                        f"视频使用 {color_space} 色彩空间，可能不被MoviePy兼容"
+                    )
+                
+                # 检查是否有side data，如Ambient Viewing Environment（-show_streams已包含side_data_list）
+                side_data = stream.get("side_data_list", [])
+                for data_item in side_data:
+                    if data_item.get("side_data_type") == "Ambient viewing environment":
                         result["video_issues"].append(
-                            f"视频使用 {color_space} 色彩空间，可能不被MoviePy兼容"
+                            f"视频包含环境观看环境元数据，可能不被MoviePy兼容"
                         )
-                    
-                    # 检查是否有side data，如Ambient Viewing Environment
-                    side_data = stream.get("side_data_list", [])
-                    for data_item in side_data:
-                        if data_item.get("side_data_type") == "Ambient viewing environment":
-                            result["video_issues"].append(
-                                f"视频包含环境观看环境元数据，可能不被MoviePy兼容"
-                            )
+            
+            elif stream.get("codec_type") == "audio":
+                codec_name = stream.get("codec_name", "").lower()
                 
-                elif stream.get("codec_type") == "audio":
-                    codec_name = stream.get("codec_name", "").lower()
-                    
-                    # 检查可能导致问题的音频编解码器
-                    if codec_name not in ["aac", "mp3", "pcm_s16le"]:
-                        result["audio_issues"].append(
-                            f"音频使用 {codec_name} 编码，可能不被MoviePy兼容"
-                        )
+                # 检查可能导致问题的音频编解码器
+                if codec_name not in OK_AUDIO_CODECS:
+                    result["audio_issues"].append(
+                        f"音频使用 {codec_name} 编码，可能不被MoviePy兼容"
+                    )
+        
+        return result
+    
+    def _detect_hw_encoder(self):
+        """
+        探测FFmpeg中可用的硬件H.264编码器，只探测一次
+        
+        编码器编译进FFmpeg不代表有对应的硬件，列出的编码器需要试编码一帧成功才会使用
+        
+        Returns:
+            str: 硬件编码器名称，没有可用的硬件编码器时返回None
+        """
+        with self._hw_lock:
+            if self._hw_encoder is None:
+                self._hw_encoder = ''
+                try:
+                    result = subprocess.run([self.ffmpeg_path, '-hide_banner', '-encoders'],
+                                            capture_output=True, **SPAWN_KWARGS)
+                    if result.returncode == 0:
+                        for encoder in HW_H264_ENCODERS:
+                            if f" {encoder} ".encode() in result.stdout and self._test_hw_encoder(encoder):
+                                self._hw_encoder = encoder
+                                break
+                except Exception:
+                    pass
+            return self._hw_encoder or None
+    
+    def _test_hw_encoder(self, encoder):
+        """使用测试图像编码一帧，确认硬件编码器实际可用"""
+        cmd = [
+            self.ffmpeg_path,
+            '-hide_banner',
+            '-v', 'error',
+            '-f', 'lavfi',
+            '-i', 'color=c=black:s=256x256:d=0.1',
+            '-frames:v', '1',
+            '-pix_fmt', HW_ENCODER_PIX_FMTS.get(encoder, 'yuv420p'),
+            '-c:v', encoder,
+            '-f', 'null', '-'
+        ]
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                    timeout=30, **SPAWN_KWARGS)
+            return result.returncode == 0
+        except Exception:
+            return False
+    
+    def _recheck_hw_encoder(self, encoder):
+        """
+        硬件编码失败而libx264成功后重新试编码，确认是硬件不可用（而非源文件超出硬件限制）时才停用硬件编码器
+        
+        Args:
+            encoder: 编码失败的硬件编码器名称
             
-            return result
+        Returns:
+            bool: 停用了硬件编码器时返回True
+        """
+        with self._hw_lock:
+            if self._hw_encoder != encoder or self._test_hw_encoder(encoder):
+                return False
+            self._hw_encoder = ''
+            return True
+    
+    def _build_fix_cmd(self, input_path, output_path, encoder, settings, quality, threads=None):
+        """
+        构建修复命令：直接解码原文件并重新编码，丢弃全局元数据、章节以及编码后码流中的SEI单元（NAL类型6，包含环境观看环境等侧数据）
         
-        except Exception as e:
-            # 错误处理：如果出现异常，记录错误但不中断检测
-            print(f"识别问题流时出错: {e}")
-            return result
+        Args:
+            input_path: 输入文件路径
+            output_path: 输出文件路径
+            encoder: 视频编码器（'libx264'或硬件编码器）
+            settings: libx264的质量设置
+            quality: 质量等级
+            threads: ffmpeg的-threads值，None表示由ffmpeg自行决定
+            
+        Returns:
+            list: 命令参数列表
+        """
+        if encoder == 'libx264':
+            decode_args = []
+            video_args = ['-preset', settings['preset'], '-crf', settings['crf']]  # 编码预设和质量设置
+        else:
+            decode_args = ['-hwaccel', 'auto']  # 硬件解码
+            video_args = HW_ENCODER_QUALITY_ARGS[encoder].get(quality, HW_ENCODER_QUALITY_ARGS[encoder]['medium'])
+        
+        return [
+            self.ffmpeg_path,
+            '-y',  # 覆盖输出文件
+            '-progress', 'pipe:1',  # 机器可读的进度数据输出到stdout
+            '-nostats',  # stderr不输出统计行
+            '-loglevel', 'error',  # stderr只保留错误信息
+            *decode_args,
+            '-i', input_path,  # 输入文件
+            '-map', '0:v:0',  # 第一个视频流
+            '-map', '0:a?',  # 音频流（如果存在），不包含字幕和数据流
+            '-map_metadata', '-1',  # 丢弃全局元数据
+            '-map_chapters', '-1',  # 丢弃章节
+            '-c:v', encoder,  # 视频编码
+            *video_args,
+            '-pix_fmt', HW_ENCODER_PIX_FMTS.get(encoder, 'yuv420p'),  # 输出像素格式
+            '-color_primaries', 'bt709',  # 色彩空间原色
+            '-color_trc', 'bt709',  # 色彩空间传输特性
+            '-colorspace', 'bt709',  # 色彩空间
+            '-bsf:v', 'filter_units=remove_types=6',  # 移除SEI单元
+            '-c:a', 'aac',  # 音频编码
+            '-b:a', '128k',  # 音频比特率
+            '-ar', '44100',  # 音频采样率
+            *(['-threads', str(threads)] if threads else []),  # 编码线程数
+            '-movflags', '+faststart',  # 优化MP4结构
+            output_path  # 输出文件
+        ]
+    
+    @staticmethod
+    def _format_progress(progress, duration):
+        """将一个 -progress 数据块格式化为日志文本"""
+        parts = []
+        out_time = progress.get(b"out_time_us") or progress.get(b"out_time_ms")  # 旧版本FFmpeg只有out_time_ms（单位实际为微秒）
+        try:
+            seconds = int(out_time) / 1000000
+        except (TypeError, ValueError):
+            seconds = None
+        
+        if seconds is not None and duration:
+            parts.append(f"进度: {min(100.0, seconds / duration * 100):.1f}%")
+        if seconds is not None:
+            parts.append(f"时间: {seconds:.1f}s")
+        for key, label in ((b"fps", "FPS"), (b"speed", "速度")):
+            value = progress.get(key)
+            if value and value != b"N/A":
+                parts.append(f"{label}: {value.decode('ascii', 'replace')}")
+        return ", ".join(parts)
     
-    def fix_video(self, video_info, output_path=None, quality='medium', delete_original=False, callback=None):
+    def _run_ffmpeg(self, cmd, log, duration=None):
+        """
+        运行FFmpeg命令，stdout的 -progress 数据按时间间隔写入日志，stderr的错误信息由后台线程写入日志
+        
+        Args:
+            cmd: 命令参数列表（需包含 "-progress pipe:1 -nostats"）
+            log: 日志回调函数
+            duration: 输入视频时长（秒），用于计算进度百分比
+            
+        Returns:
+            int: FFmpeg返回码
+        """
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **SPAWN_KWARGS
+        )
+        
+        # 后台线程读取stderr，避免管道写满阻塞FFmpeg
+        pump = threading.Thread(target=self._pump_stderr, args=(process, log), daemon=True)
+        pump.start()
+        
+        # 累积 key=value 直到 progress=continue|end 为一个数据块，每个数据块最多输出一条日志并按时间间隔节流
+        progress = {}
+        last_log_time = 0
+        with process.stdout:
+            for line in process.stdout:
+                key, _, value = line.strip().partition(b"=")
+                progress[key] = value
+                if key != b"progress":
+                    continue
+                now = time.monotonic()
+                if value == b"end" or now - last_log_time >= PROGRESS_LOG_INTERVAL:
+                    last_log_time = now
+                    log(self._format_progress(progress, duration))
+                progress = {}
+        
+        return_code = process.wait()
+        pump.join(timeout=1.0)
+        return return_code
+    
+    @staticmethod
+    def _pump_stderr(proc, log_cb):
+        """
+        后台线程：按块读取进程的stderr，拆分成行后交给日志回调
+        
+        Args:
+            proc: subprocess.Popen对象（stderr为二进制管道，直接按文件描述符读取）
+            log_cb: 日志回调函数
+        """
+        fd = proc.stderr.fileno()
+        buf = b''
+        try:
+            while True:
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    break
+                # FFmpeg的进度行以\r结尾，与\n一样视为换行
+                *lines, buf = (buf + chunk).replace(b'\r', b'\n').split(b'\n')
+                for line in lines:
+                    line = line.strip()
+                    if line:
+                        log_cb(line.decode('utf-8', 'replace'))
+            if buf.strip():
+                log_cb(buf.strip().decode('utf-8', 'replace'))
+        except OSError:
+            pass
+        finally:
+            proc.stderr.close()
+    
+    def fix_video(self, video_info, output_path=None, quality='medium', delete_original=False, callback=None,
+                  verify=False, threads=None):
         """
         修复不兼容的视频
         
@@ -488,6 +1052,8 @@ class VideoDetector:
             quality: 转码质量，可选'low'、'medium'、'high'
             delete_original: 这个参数在不添加后缀的情况下被忽略，因为原文件会被替换
             callback: 可选的回调函数，用于日志记录
+            verify: 是否在修复后用ffprobe重新检测输出文件 (默认: False)
+            threads: ffmpeg的-threads值，None表示由ffmpeg自行决定
             
         Returns:
             (success, message): 成功标志和消息
@@ -507,7 +1073,6 @@ class VideoDetector:
         # 获取原文件路径和目录
         original_path = video_info.filepath
         dirname = os.path.dirname(original_path)
-        basename = os.path.basename(original_path)
         
         # 创建临时输出文件路径
         temp_output_path = None
@@ -551,154 +1116,55 @@ class VideoDetector:
         # 获取当前质量设置
         settings = quality_settings.get(quality, quality_settings['medium'])
         
-        # 获取视频原始信息用于两阶段转换
-        orig_info = self._get_video_info(original_path)
-        width = orig_info.get('width', 1920) if orig_info else 1920
-        height = orig_info.get('height', 1080) if orig_info else 1080
-        fps = orig_info.get('fps', 30) if orig_info else 30
-        
-        # 创建raw中间文件路径
-        raw_temp_path = None
-        fd, raw_temp_path = tempfile.mkstemp(suffix='.yuv', prefix='raw_temp_', dir=dirname)
-        os.close(fd)
-        self._temp_files.append(raw_temp_path)
-        
-        # 第一阶段：解码到原始YUV，彻底移除所有元数据和侧数据
-        log(f"阶段1: 将视频解码为原始YUV格式，清除所有元数据...")
-        stage1_cmd = [
-            self.ffmpeg_path,
-            '-y',  # 覆盖输出文件
-            '-i', original_path,  # 输入文件
-            '-an',  # 不包含音频
-            '-sn',  # 不包含字幕
-            '-f', 'rawvideo',  # 原始视频格式
-            '-pix_fmt', 'yuv420p',  # 像素格式
-            raw_temp_path  # 输出到临时文件
-        ]
-        
-        # 第二阶段：从原始YUV重新编码，仅保留原始音频
-        log(f"阶段2: 从原始YUV重新编码视频，使用干净的容器...")
-        stage2_cmd = [
-            self.ffmpeg_path,
-            '-y',  # 覆盖输出文件
-            '-f', 'rawvideo',  # 输入格式为原始视频
-            '-pix_fmt', 'yuv420p',  # 输入像素格式
-            '-s', f'{width}x{height}',  # 视频尺寸
-            '-r', str(fps),  # 帧率
-            '-i', raw_temp_path,  # 原始视频输入
-            '-i', original_path,  # 原始文件（仅用于提取音频）
-            '-map', '0:v',  # 使用原始视频流
-            '-map', '1:a?',  # 使用原始音频流（如果存在）
-            '-c:v', 'libx264',  # 视频编码
-            '-preset', settings['preset'],  # 编码预设
-            '-crf', settings['crf'],  # 质量设置
-            '-pix_fmt', 'yuv420p',  # 输出像素格式
-            '-color_primaries', 'bt709',  # 色彩空间原色
-            '-color_trc', 'bt709',  # 色彩空间传输特性
-            '-colorspace', 'bt709',  # 色彩空间
-            '-c:a', 'aac',  # 音频编码
-            '-b:a', '128k',  # 音频比特率
-            '-ar', '44100',  # 音频采样率
-            '-movflags', '+faststart',  # 优化MP4结构
-            temp_output_path  # 输出文件
-        ]
+        # 有可用的硬件编码器时优先使用，否则使用libx264
+        encoder = self._detect_hw_encoder() or 'libx264'
+        log(f"将视频重新编码为干净的H.264/AAC，清除所有元数据和侧数据...")
         
         try:
-            # 执行第一阶段：解码到原始YUV
-            log(f"开始阶段1: 解码视频到原始格式...")
-            
-            process1 = subprocess.Popen(
-                stage1_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1,
-                encoding='utf-8'
-            )
-            
-            # 读取输出并更新日志
-            while True:
-                output = process1.stderr.readline()
-                if output == '' and process1.poll() is not None:
-                    break
-                if output:
-                    log(output.strip())
-            
-            # 获取返回码
-            return_code1 = process1.poll()
-            
-            if return_code1 != 0:
-                return False, f"阶段1解码失败，返回代码: {return_code1}"
+            log(f"开始重新编码视频 (编码器: {encoder})...")
+            return_code = self._run_ffmpeg(
+                self._build_fix_cmd(original_path, temp_output_path, encoder, settings, quality, threads),
+                log, video_info.duration)
             
-            log(f"阶段1完成：成功解码到原始格式")
+            if return_code != 0 and encoder != 'libx264':
+                # 源文件超出硬件限制（如10bit、分辨率过大）或硬件、驱动不可用时，该文件改用libx264重试
+                log(f"硬件编码器 {encoder} 编码失败，改用libx264重试...")
+                hw_encoder, encoder = encoder, 'libx264'
+                return_code = self._run_ffmpeg(
+                    self._build_fix_cmd(original_path, temp_output_path, encoder, settings, quality, threads),
+                    log, video_info.duration)
+                if return_code == 0 and self._recheck_hw_encoder(hw_encoder):
+                    log(f"硬件编码器 {hw_encoder} 已不可用，之后的修复将直接使用libx264")
             
-            # 执行第二阶段：重新编码
-            log(f"开始阶段2: 重新编码视频...")
-            
-            process2 = subprocess.Popen(
-                stage2_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1,
-                encoding='utf-8'
-            )
-            
-            # 读取输出并更新日志
-            while True:
-                output = process2.stderr.readline()
-                if output == '' and process2.poll() is not None:
-                    break
-                if output:
-                    log(output.strip())
-            
-            # 获取返回码
-            return_code2 = process2.poll()
-            
-            if return_code2 != 0:
-                return False, f"阶段2编码失败，返回代码: {return_code2}"
+            if return_code != 0:
+                return False, f"重新编码失败，返回代码: {return_code}"
             
             # 检查输出文件是否创建成功
             if not os.path.exists(temp_output_path) or os.path.getsize(temp_output_path) == 0:
                 return False, "转换失败: 输出文件未创建或为空"
             
-            # 删除临时原始文件
-            try:
-                if os.path.exists(raw_temp_path):
-                    os.remove(raw_temp_path)
-                    log(f"已删除临时原始文件: {raw_temp_path}")
-                    if raw_temp_path in self._temp_files:
-                        self._temp_files.remove(raw_temp_path)
-            except Exception as e:
-                log(f"删除临时原始文件失败: {str(e)}")
-            
-            # 检查修复后的文件是否有兼容性问题
-            log("验证修复后的文件...")
-            new_issues = self._identify_problematic_streams(temp_output_path)
-            if new_issues["video_issues"] or new_issues["audio_issues"]:
-                log(f"警告: 修复后的文件仍存在兼容性问题:")
-                for issue in new_issues["video_issues"] + new_issues["audio_issues"]:
-                    log(f"- {issue}")
-                # 但我们仍然继续，因为文件可能已经改善
-            else:
-                log("验证成功: 修复后的文件没有检测到兼容性问题")
+            # 输出参数固定为H.264/yuv420p/bt709/AAC，兼容性由构造保证，只在要求时重新检测
+            fixed_data = None
+            if verify:
+                log("验证修复后的文件...")
+                try:
+                    fixed_data = self._probe_raw(temp_output_path) if self.has_ffprobe else None
+                except Exception as e:
+                    log(f"识别问题流时出错: {e}")
+                new_issues = self._issues_from_data(fixed_data) if fixed_data else {"video_issues": [], "audio_issues": []}
+                if new_issues["video_issues"] or new_issues["audio_issues"]:
+                    log(f"警告: 修复后的文件仍存在兼容性问题:")
+                    for issue in new_issues["video_issues"] + new_issues["audio_issues"]:
+                        log(f"- {issue}")
+                    # 但我们仍然继续，因为文件可能已经改善
+                else:
+                    log("验证成功: 修复后的文件没有检测到兼容性问题")
             
             # 如果使用临时文件，现在替换原文件
             if temp_output_path != output_path:
                 try:
-                    # 原文件可能正在被其他程序使用，先尝试删除
-                    if os.path.exists(original_path):
-                        try:
-                            os.remove(original_path)
-                        except Exception as e:
-                            log(f"无法删除原文件，尝试更改名称: {str(e)}")
-                            # 如果无法删除，尝试重命名
-                            backup_path = original_path + ".bak"
-                            os.rename(original_path, backup_path)
-                            log(f"已将原文件重命名为: {backup_path}")
-                    
-                    # 现在移动临时文件到目标位置
-                    shutil.move(temp_output_path, output_path)
+                    # 临时文件与原文件在同一目录，os.replace是原子重命名，原文件路径始终存在
+                    os.replace(temp_output_path, output_path)
                     log(f"已将修复后的文件替换原文件: {output_path}")
                     
                     # 从临时文件列表中移除（已经移动了）
@@ -711,50 +1177,52 @@ class VideoDetector:
             video_info.status = VideoInfo.STATUS_FIXED
             video_info.fixed_path = output_path
             video_info.fixed_time = time.strftime("%Y-%m-%d %H:%M:%S")
-            video_info.conversion_params = f"质量: {quality}, 预设: {settings['preset']}, CRF: {settings['crf']}, 两阶段完全重编码"
+            if encoder == 'libx264':
+                video_info.conversion_params = f"质量: {quality}, 预设: {settings['preset']}, CRF: {settings['crf']}, 单次完全重编码"
+            else:
+                video_info.conversion_params = f"质量: {quality}, 编码器: {encoder}, 单次完全重编码"
             
-            # 更新修复后的视频信息
-            if self.has_ffprobe:
-                try:
-                    fixed_info = self._get_video_info(output_path)
-                    if fixed_info and 'codec' in fixed_info:
-                        log(f"修复后的编码: {fixed_info['codec']}")
-                except Exception:
-                    pass
+            # 输出验证时的探测结果
+            if fixed_data:
+                fixed_info = self._extract_info(fixed_data)
+                if 'codec' in fixed_info:
+                    log(f"修复后的编码: {fixed_info['codec']}")
             
             return True, f"视频修复成功: {os.path.basename(output_path)}"
             
         except Exception as e:
             log(f"转换过程发生错误: {str(e)}")
-            traceback.print_exc()
+            if self.debug:
+                log(traceback.format_exc())
             return False, f"转换错误: {str(e)}"
-        finally:
-            # 确保清理临时原始文件
-            try:
-                if os.path.exists(raw_temp_path):
-                    os.remove(raw_temp_path)
-                    if raw_temp_path in self._temp_files:
-                        self._temp_files.remove(raw_temp_path)
-            except Exception:
-                pass
 
 
 class VideoDetectorApp:
     """视频检测器应用类"""
     
-    def __init__(self, master):
-        """初始化应用"""
+    def __init__(self, master, use_cache=True, debug=False):
+        """
+        初始化应用
+        
+        Args:
+            master: Tk根窗口
+            use_cache: 是否使用ffprobe结果的磁盘缓存 (默认: True)
+            debug: 出错时是否将完整的异常堆栈写入日志 (默认: False)
+        """
+        self.debug = debug
         self.master = master
         self.master.title("视频检测与修复工具")
         self.master.geometry("1000x700")
         self.master.minsize(800, 600)
+        self.master.protocol("WM_DELETE_WINDOW", self._on_close)
         
         # 检测器实例
-        self.detector = VideoDetector()
+        self.detector = VideoDetector(use_cache=use_cache, debug=debug)
         
         # 添加删除原文件选项（放在这里，在_create_ui之前）- 对于直接替换模式，我们可以隐藏这个选项或改变其行为
         self.delete_original_var = tk.BooleanVar(value=False)
         self.keep_original_name_var = tk.BooleanVar(value=True)  # 新增：保持原文件名选项
+        self.verify_after_fix_var = tk.BooleanVar(value=False)  # 修复后重新检测输出文件
         
         # 检查环境依赖
         self._check_dependencies()
@@ -764,18 +1232,33 @@ class VideoDetectorApp:
         
         # 初始化日志队列
         self.log_queue = queue.Queue()
-        self.master.after(100, self._process_log_queue)
+        self.master.after(LOG_POLL_INTERVAL_MS, self._process_log_queue)
+        
+        # 初始化界面更新队列，工作线程通过_post_ui提交更新，由主线程统一应用
+        self.ui_queue = queue.Queue()
+        self.master.after(UI_POLL_INTERVAL_MS, self._process_ui_queue)
         
         # 存储检测结果
         self.video_info_list = []
         self.selected_video_index = -1
+        self._shown_details = None  # 详情文本框当前显示的内容
+        
+        # 列表索引与树形视图项之间的映射，避免每次更新都遍历树形视图
+        self._mounted_rows = {}  # 索引 -> 树形视图项ID（只包含当前挂载的行）
+        self._rendered_rows = {}  # 索引 -> 已挂载行当前显示的(values, tags)
+        self._row_cache = OrderedDict()  # 最近显示过的行：索引 -> (摘要, (values, tags))，滚动回来时复用
+        self._row_cache_size = 2 * (1 + TREE_OVERSCAN_ROWS)  # 行缓存容量，随可见行数调整为两屏
+        self._item_index = {}  # 树形视图项ID -> 索引
+        self._filepath_index = {}  # 规范文件路径 -> 索引（同一文件的不同写法视为重复）
+        self._view_first = 0  # 可见范围第一行的索引
+        self._error_count = 0  # 状态为错误的文件数，状态变化时增量维护
         
         # 记录日志
         self.log_message("视频检测工具已启动")
         self.log_message(f"FFmpeg {'可用' if self.detector.has_ffmpeg else '不可用'}")
         self.log_message(f"FFprobe {'可用' if self.detector.has_ffprobe else '不可用'}")
         self.log_message("使用基于规则的检测逻辑，检查视频编解码器、像素格式和色彩空间等参数")
-        self.log_message("增强版修复引擎: 使用两阶段完全重编码方式，彻底清除侧数据")
+        self.log_message("增强版修复引擎: 单次完全重编码并移除SEI单元，彻底清除元数据和侧数据")
     
     def _check_dependencies(self):
         """检查依赖"""
@@ -835,6 +1318,9 @@ class VideoDetectorApp:
         self.clear_btn = ttk.Button(btn_frame, text="清空列表", command=self._clear_list)
         self.clear_btn.pack(side=tk.LEFT, padx=(0, 5))
         
+        self.clear_cache_btn = ttk.Button(btn_frame, text="清除元数据缓存", command=self._clear_probe_cache)
+        self.clear_cache_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
         # 选项框架
         options_frame = ttk.Frame(toolbar)
         options_frame.pack(side=tk.LEFT, padx=(10, 0))
@@ -856,6 +1342,14 @@ class VideoDetectorApp:
         )
         self.delete_checkbox.pack(side=tk.LEFT, padx=(10, 0))
         
+        # 修复后验证选项
+        self.verify_checkbox = ttk.Checkbutton(
+            options_frame, 
+            text="修复后验证", 
+            variable=self.verify_after_fix_var
+        )
+        self.verify_checkbox.pack(side=tk.LEFT, padx=(10, 0))
+        
         # 监听保持原文件名变量，根据情况启用/禁用删除原文件选项
         self.keep_original_name_var.trace_add("write", self._update_delete_checkbox_state)
         self._update_delete_checkbox_state()  # 初始化时调用一次
@@ -901,16 +1395,30 @@ class VideoDetectorApp:
         self.tree.column("duration", width=80, anchor="center")
         self.tree.column("codec", width=80, anchor="center")
         
-        # 滚动条
-        tree_scroll = ttk.Scrollbar(left_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=tree_scroll.set)
+        # 为各状态的行标签配置颜色
+        for status, tag in VideoInfo.STATUS_TAGS.items():
+            self.tree.tag_configure(tag, foreground=VideoInfo.STATUS_COLORS[status])
+        
+        # 滚动条（表格只挂载可见范围内的行，滚动条按完整列表计算位置）
+        self.tree_scroll = ttk.Scrollbar(left_frame, orient="vertical", command=self._on_tree_scroll)
+        self._tree_row_height = int(self.style.lookup("Treeview", "rowheight") or 20)
         
         # 放置表格和滚动条
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
         # 绑定事件
         self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<Configure>", lambda e: self._render_tree_rows())
+        self.tree.bind("<MouseWheel>", self._on_tree_wheel)
+        self.tree.bind("<Button-4>", self._on_tree_wheel)
+        self.tree.bind("<Button-5>", self._on_tree_wheel)
+        self.tree.bind("<Up>", lambda e: self._move_tree_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_tree_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._move_tree_selection(-self._visible_row_count()))
+        self.tree.bind("<Next>", lambda e: self._move_tree_selection(self._visible_row_count()))
+        self.tree.bind("<Home>", lambda e: self._select_tree_row(0))
+        self.tree.bind("<End>", lambda e: self._select_tree_row(len(self.video_info_list) - 1))
         
         # 右侧详情和日志
         right_pane = ttk.PanedWindow(content, orient=tk.VERTICAL)
@@ -952,6 +1460,20 @@ class VideoDetectorApp:
                                          length=200, mode="determinate")
         self.progressbar.pack(side=tk.RIGHT, padx=5)
     
+    def _on_close(self):
+        """关闭窗口时保存元数据缓存"""
+        self.detector.close()
+        self.master.destroy()
+    
+    def _clear_probe_cache(self):
+        """清除ffprobe元数据缓存"""
+        confirm = messagebox.askyesno("确认", "确定要清除元数据缓存吗？\n下次检测时将重新分析所有文件。")
+        if not confirm:
+            return
+        
+        self.detector.clear_probe_cache()
+        self.log_message("已清除元数据缓存")
+    
     def _update_delete_checkbox_state(self, *args):
         """根据保持原文件名选项更新删除原文件选项的状态"""
         if self.keep_original_name_var.get():
@@ -966,45 +1488,91 @@ class VideoDetectorApp:
         """配置样式"""
         # 配置常规按钮样式
         self.style.configure("TButton", padding=6)
-        
-        # 为状态列配置样式标签
-        self.tree_tags_configured = False
-    
-    def _update_tree_tags(self):
-        """更新树形视图标签样式"""
-        if not self.tree_tags_configured:
-            self.tree.tag_configure("ok", foreground="green")
-            self.tree.tag_configure("error", foreground="red")
-            self.tree.tag_configure("fixed", foreground="blue")
-            self.tree.tag_configure("unknown", foreground="black")
-            self.tree.tag_configure("processing", foreground="orange")
-            self.tree_tags_configured = True
     
     def log_message(self, message):
         """添加消息到日志队列"""
         self.log_queue.put(message)
     
     def _process_log_queue(self):
-        """处理日志队列中的消息"""
+        """处理日志队列中的消息，每次取出全部待处理消息并一次性写入文本框，文本框最多保留LOG_MAX_LINES行"""
         try:
+            pending = []
             while True:
-                message = self.log_queue.get_nowait()
-                
+                try:
+                    pending.append(self.log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if pending:
                 self.log_text.config(state=tk.NORMAL)
-                self.log_text.insert(tk.END, f"{message}\n")
+                self.log_text.insert(tk.END, "\n".join(map(str, pending)) + "\n")
+                if int(self.log_text.index("end-1c").split(".")[0]) > LOG_MAX_LINES:
+                    self.log_text.delete("1.0", f"end-{LOG_MAX_LINES}l")
                 self.log_text.see(tk.END)
                 self.log_text.config(state=tk.DISABLED)
-        except queue.Empty:
-            pass
         finally:
-            self.master.after(100, self._process_log_queue)
+            self.master.after(LOG_POLL_INTERVAL_MS, self._process_log_queue)
+    
+    def _post_ui(self, kind, payload=None):
+        """
+        从工作线程提交界面更新
+        
+        Args:
+            kind: 更新类型，'status'（状态栏文本）、'progress'（进度值）、'row'（列表项索引）、
+                  'row_status'（列表项索引，只更新状态列）、'details'（列表项索引，是当前选中项时刷新详情）
+                  或'call'（在主线程执行的无参函数）
+            payload: 更新内容
+        """
+        self.ui_queue.put((kind, payload))
+    
+    def _process_ui_queue(self):
+        """处理界面更新队列：状态栏和进度条只应用最新值，同一列表项只刷新一次，函数按提交顺序执行"""
+        try:
+            status = progress = None
+            rows = {}
+            show_details = False
+            calls = []
+            while True:
+                try:
+                    kind, payload = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                
+                if kind == "status":
+                    status = payload
+                elif kind == "progress":
+                    progress = payload
+                elif kind == "row":
+                    rows[payload] = True
+                elif kind == "row_status":
+                    rows.setdefault(payload, False)
+                elif kind == "details":
+                    show_details = show_details or payload == self.selected_video_index
+                elif kind == "call":
+                    calls.append(payload)
+            
+            for index, full in rows.items():
+                if full:
+                    self._update_file_list_item(index)
+                else:
+                    self._update_status_only(index)
+            if show_details and 0 <= self.selected_video_index < len(self.video_info_list):
+                self._show_details(self.video_info_list[self.selected_video_index])
+            if status is not None:
+                self.status_var.set(status)
+            if progress is not None:
+                self.progress_var.set(progress)
+            for call in calls:
+                call()
+        finally:
+            self.master.after(UI_POLL_INTERVAL_MS, self._process_ui_queue)
     
     def _browse_videos(self):
         """浏览选择视频文件"""
         file_paths = filedialog.askopenfilenames(
             title="选择视频文件",
             filetypes=[
-                ("视频文件", "*.mp4 *.avi *.mov *.mkv *.webm *.flv *.wmv"),
+                ("视频文件", " ".join(f"*{ext}" for ext in sorted(VIDEO_EXTENSIONS))),
                 ("所有文件", "*.*")
             ]
         )
@@ -1013,11 +1581,10 @@ class VideoDetectorApp:
             return
         
         # 添加到文件列表
-        for path in file_paths:
-            self._add_to_file_list(path)
+        added = self._add_files_bulk((path, None) for path in file_paths)
         
-        self.log_message(f"已添加 {len(file_paths)} 个文件到列表")
-        self.status_var.set(f"已添加 {len(file_paths)} 个文件")
+        self.log_message(f"已添加 {added} 个文件到列表")
+        self.status_var.set(f"已添加 {added} 个文件")
     
     def _browse_folder(self):
         """浏览选择文件夹，支持递归查找子文件夹"""
@@ -1026,28 +1593,14 @@ class VideoDetectorApp:
         if not folder_path:
             return
         
-        # 查找文件夹及其子文件夹中的视频文件
-        video_extensions = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".flv", ".wmv")
-        video_files = []
-        
         # 选择是否搜索子文件夹
         include_subfolders = messagebox.askyesno(
             "子文件夹", 
             "是否包含子文件夹中的视频文件？"
         )
         
-        if include_subfolders:
-            # 递归搜索所有子文件夹
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    if file.lower().endswith(video_extensions):
-                        video_files.append(os.path.join(root, file))
-        else:
-            # 只搜索当前文件夹
-            for file in os.listdir(folder_path):
-                filepath = os.path.join(folder_path, file)
-                if os.path.isfile(filepath) and file.lower().endswith(video_extensions):
-                    video_files.append(filepath)
+        # 查找文件夹（及其子文件夹）中的视频文件，同时得到文件大小
+        video_files = list(_iter_video_files(folder_path, recursive=include_subfolders))
         
         if not video_files:
             messagebox.showinfo("提示", f"在所选文件夹{' 及其子文件夹' if include_subfolders else ''}中未找到视频文件: {folder_path}")
@@ -1063,27 +1616,71 @@ class VideoDetectorApp:
             return
         
         # 添加到文件列表
-        for path in video_files:
-            self._add_to_file_list(path)
-        
-        self.log_message(f"已从文件夹{' 及其子文件夹' if include_subfolders else ''}添加 {len(video_files)} 个视频文件")
-        self.status_var.set(f"已从文件夹添加 {len(video_files)} 个文件")
-    
-    def _add_to_file_list(self, file_path):
-        """添加文件到列表"""
-        # 检查是否已经在列表中
-        for info in self.video_info_list:
-            if info.filepath == file_path:
-                self.log_message(f"文件已在列表中: {os.path.basename(file_path)}")
-                return
+        added = self._add_files_bulk(video_files)
+        
+        self.log_message(f"已从文件夹{' 及其子文件夹' if include_subfolders else ''}添加 {added} 个视频文件")
+        self.status_var.set(f"已从文件夹添加 {added} 个文件")
+    
+    def _add_files_bulk(self, files):
+        """
+        批量添加文件到列表，树形视图和按钮状态只在全部添加后更新一次
+        
+        Args:
+            files: (file_path, filesize) 序列，filesize为None时读取文件信息
+            
+        Returns:
+            int: 实际添加的文件数（不含已在列表中的文件）
+        """
+        added = 0
+        skipped = 0
+        for file_path, filesize in files:
+            # 检查是否已经在列表中（包括本次添加中重复的路径）
+            key = _canonical_path(file_path)
+            if key in self._filepath_index:
+                skipped += 1
+                continue
+            
+            # 创建VideoInfo对象
+            self._filepath_index[key] = len(self.video_info_list)
+            self.video_info_list.append(VideoInfo(file_path, filesize))
+            added += 1
+        
+        if skipped:
+            self.log_message(f"{skipped} 个文件已在列表中，已跳过")
         
-        # 创建VideoInfo对象
-        info = VideoInfo(file_path)
-        self.video_info_list.append(info)
+        if added:
+            # 新行在可见范围内时挂载到树形视图
+            self._render_tree_rows()
+            
+            # 更新按钮状态
+            self._update_buttons()
+        return added
+    
+    def _set_status(self, index, status):
+        """设置列表项状态，同时维护错误文件计数"""
+        info = self.video_info_list[index]
+        self._error_count += (status == VideoInfo.STATUS_ERROR) - (info.status == VideoInfo.STATUS_ERROR)
+        info.status = status
+    
+    def _replace_info(self, index, info):
+        """用检测结果替换列表项，同时维护错误文件计数"""
+        old_info = self.video_info_list[index]
+        self._error_count += (info.status == VideoInfo.STATUS_ERROR) - (old_info.status == VideoInfo.STATUS_ERROR)
+        self.video_info_list[index] = info
+    
+    def _row_values(self, index):
+        """
+        获取列表项在树形视图中的显示内容（摘要未变化时复用最近生成的结果）
         
-        # 添加到树形视图
-        self._update_tree_tags()
-        summary = info.get_summary()
+        Returns:
+            (values, tags): 各列的值和行标签
+        """
+        # get_summary在字段未变化时返回同一个字典，可以用来判断缓存是否有效
+        summary = self.video_info_list[index].get_summary()
+        cached = self._row_cache.get(index)
+        if cached is not None and cached[0] is summary:
+            self._row_cache.move_to_end(index)
+            return cached[1]
         
         values = (
             summary["filename"],
@@ -1093,36 +1690,129 @@ class VideoDetectorApp:
             summary["duration"],
             summary["codec"]
         )
-        
-        item_id = self.tree.insert("", "end", values=values, tags=(summary["status"].lower(),))
-        
-        # 更新按钮状态
-        self._update_buttons()
+        row = (values, (VideoInfo.STATUS_TAGS.get(summary["status"], "unknown"),))
+        self._row_cache[index] = (summary, row)
+        self._row_cache.move_to_end(index)
+        while len(self._row_cache) > self._row_cache_size:
+            self._row_cache.popitem(last=False)
+        return row
+    
+    def _visible_row_count(self):
+        """树形视图可完整显示的行数（由第一个已挂载行的位置得到表头高度和实际行高）"""
+        item_id = self._mounted_rows.get(self._view_first)
+        bbox = self.tree.bbox(item_id) if item_id else None
+        if bbox:
+            header_height, self._tree_row_height = bbox[1], bbox[3]
+        else:
+            header_height = self._tree_row_height
+        return max(1, (self.tree.winfo_height() - header_height) // self._tree_row_height)
+    
+    def _render_tree_rows(self):
+        """只在树形视图中保留可见范围内的行：卸载移出范围的行，按位置插入进入范围的行"""
+        total = len(self.video_info_list)
+        visible = self._visible_row_count()
+        first = self._view_first = max(0, min(self._view_first, total - visible))
+        last = min(total, first + visible + TREE_OVERSCAN_ROWS)
+        self._row_cache_size = 2 * (visible + TREE_OVERSCAN_ROWS)
+        
+        # 卸载移出可见范围的行（一次delete调用删除全部）
+        unmounted = []
+        for index in [i for i in self._mounted_rows if not first <= i < last]:
+            item_id = self._mounted_rows.pop(index)
+            del self._item_index[item_id]
+            del self._rendered_rows[index]
+            unmounted.append(item_id)
+        if unmounted:
+            self.tree.delete(*unmounted)
+        
+        # 挂载进入可见范围的行（位置之前的行都已挂载，按位置插入即可保持顺序）
+        for position, index in enumerate(range(first, last)):
+            if index in self._mounted_rows:
+                continue
+            row = self._row_values(index)
+            item_id = self.tree.insert("", position, values=row[0], tags=row[1])
+            self._mounted_rows[index] = item_id
+            self._rendered_rows[index] = row
+            self._item_index[item_id] = index
+            if index == self.selected_video_index:
+                self.tree.selection_set(item_id)
+        
+        # 表格本身不滚动，滚动条按完整列表显示位置
+        self.tree.yview_moveto(0)
+        if total:
+            self.tree_scroll.set(first / total, min(1.0, (first + visible) / total))
+        else:
+            self.tree_scroll.set(0, 1)
+    
+    def _scroll_tree_to(self, first):
+        """将可见范围的第一行移动到指定索引"""
+        self._view_first = first
+        self._render_tree_rows()
+    
+    def _on_tree_scroll(self, *args):
+        """滚动条命令：'moveto 比例' 或 'scroll 数量 units|pages'"""
+        if args[0] == "moveto":
+            self._scroll_tree_to(int(float(args[1]) * len(self.video_info_list)))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self._visible_row_count() if args[2] == "pages" else 1)
+            self._scroll_tree_to(self._view_first + step)
+    
+    def _on_tree_wheel(self, event):
+        """鼠标滚轮事件（Windows/macOS为<MouseWheel>，X11为<Button-4>/<Button-5>）"""
+        if event.num == 4 or event.delta > 0:
+            self._scroll_tree_to(self._view_first - TREE_WHEEL_ROWS)
+        else:
+            self._scroll_tree_to(self._view_first + TREE_WHEEL_ROWS)
+        return "break"
+    
+    def _move_tree_selection(self, step):
+        """键盘上下移动或翻页移动选中项，移出可见范围时滚动列表"""
+        return self._select_tree_row(self.selected_video_index + step)
+    
+    def _select_tree_row(self, index):
+        """选中指定索引的行（超出范围时取最近的行），不在可见范围内时滚动列表"""
+        if not self.video_info_list:
+            return "break"
+        
+        index = max(0, min(len(self.video_info_list) - 1, index))
+        visible = self._visible_row_count()
+        if index < self._view_first:
+            self._scroll_tree_to(index)
+        elif index >= self._view_first + visible:
+            self._scroll_tree_to(index - visible + 1)
+        
+        item_id = self._mounted_rows.get(index)
+        if item_id:
+            self.tree.selection_set(item_id)
+            self.tree.focus(item_id)
+        return "break"
     
     def _update_file_list_item(self, index):
-        """更新文件列表项"""
-        if index < 0 or index >= len(self.video_info_list):
+        """更新文件列表项（不在可见范围内的行滚动进入时再显示，显示内容未变化时不更新）"""
+        item_id = self._mounted_rows.get(index)
+        if item_id is None:
             return
         
-        info = self.video_info_list[index]
-        summary = info.get_summary()
-        
-        # 查找树形视图中对应的项
-        for item_id in self.tree.get_children():
-            if self.tree.item(item_id)["values"][0] == summary["filename"]:
-                self.tree.item(
-                    item_id, 
-                    values=(
-                        summary["filename"],
-                        summary["status"],
-                        summary["size"],
-                        summary["resolution"],
-                        summary["duration"],
-                        summary["codec"]
-                    ),
-                    tags=(summary["status"].lower(),)
-                )
-                break
+        row = self._row_values(index)
+        if row == self._rendered_rows[index]:
+            return
+        self._rendered_rows[index] = row
+        self.tree.item(item_id, values=row[0], tags=row[1])
+    
+    def _update_status_only(self, index):
+        """只更新文件列表项的状态列和行标签（其他列未变化时使用）"""
+        item_id = self._mounted_rows.get(index)
+        if item_id is None:
+            return
+        
+        status = self.video_info_list[index].status
+        values, tags = self._rendered_rows[index]
+        row = (values[:1] + (status,) + values[2:], (VideoInfo.STATUS_TAGS.get(status, "unknown"),))
+        if row == self._rendered_rows[index]:
+            return
+        self._rendered_rows[index] = row
+        self.tree.set(item_id, "status", status)
+        self.tree.item(item_id, tags=row[1])
     
     def _on_tree_select(self, event):
         """树形视图选择事件处理"""
@@ -1130,25 +1820,26 @@ class VideoDetectorApp:
         if not selection:
             return
         
-        # 获取选中项的文件名
-        item_id = selection[0]
-        filename = self.tree.item(item_id)["values"][0]
+        # 由选中项ID直接得到索引（不按文件名查找，不同文件夹中的同名文件也能区分）
+        index = self._item_index.get(selection[0])
+        if index is None:
+            return
         
-        # 查找对应的VideoInfo
-        for i, info in enumerate(self.video_info_list):
-            if info.filename == filename:
-                self.selected_video_index = i
-                self._show_details(info)
-                
-                # 更新按钮状态
-                self._update_buttons()
-                break
+        self.selected_video_index = index
+        self._show_details(self.video_info_list[index])
+        
+        # 更新按钮状态
+        self._update_buttons()
     
     def _show_details(self, info):
-        """显示详细信息"""
+        """显示详细信息（内容与当前显示相同时不更新文本框）"""
+        details = info.get_details()
+        if details == self._shown_details:
+            return
+        self._shown_details = details
+        
         self.details_text.config(state=tk.NORMAL)
-        self.details_text.delete(1.0, tk.END)
-        self.details_text.insert(tk.END, info.get_details())
+        self.details_text.replace("1.0", tk.END, details)
         self.details_text.config(state=tk.DISABLED)
     
     def _clear_list(self):
@@ -1162,10 +1853,19 @@ class VideoDetectorApp:
                 return
         
         self.video_info_list = []
+        self._mounted_rows = {}
+        self._rendered_rows = {}
+        self._row_cache.clear()
+        self._item_index = {}
+        self._filepath_index = {}
+        self._view_first = 0
+        self._error_count = 0
         self.tree.delete(*self.tree.get_children())
+        self.tree_scroll.set(0, 1)
         self.details_text.config(state=tk.NORMAL)
         self.details_text.delete(1.0, tk.END)
         self.details_text.config(state=tk.DISABLED)
+        self._shown_details = None
         self.selected_video_index = -1
         
         self._update_buttons()
@@ -1176,7 +1876,7 @@ class VideoDetectorApp:
         """更新按钮状态"""
         has_files = len(self.video_info_list) > 0
         has_selection = self.selected_video_index >= 0
-        has_errors = any(info.status == VideoInfo.STATUS_ERROR for info in self.video_info_list)
+        has_errors = self._error_count > 0
         
         # 开始检测按钮
         self.start_btn.config(state=tk.NORMAL if has_files else tk.DISABLED)
@@ -1231,45 +1931,52 @@ class VideoDetectorApp:
         try:
             total_files = len(self.video_info_list)
             self.log_message(f"开始检测 {total_files} 个视频文件")
-            self.status_var.set(f"正在检测文件...")
+            self._post_ui("status", "正在检测文件...")
             
-            for i, info in enumerate(self.video_info_list):
-                # 更新状态
-                self.master.after(0, lambda: self.status_var.set(
-                    f"正在检测 ({i+1}/{total_files}): {info.filename}"
-                ))
-                
-                # 更新进度条
-                progress = (i / total_files) * 100
-                self.master.after(0, lambda p=progress: self.progress_var.set(p))
-                
-                # 设置状态为处理中
-                info.status = VideoInfo.STATUS_PROCESSING
-                self.master.after(0, lambda idx=i: self._update_file_list_item(idx))
-                
-                # 检测视频
-                self.log_message(f"检测 ({i+1}/{total_files}): {info.filename}")
+            # 设置状态为处理中
+            for i in range(total_files):
+                self._set_status(i, VideoInfo.STATUS_PROCESSING)
+                self._post_ui("row_status", i)
+            
+            completed = 0
+            last_percent = 0
+            
+            def on_result(i, detected_info):
+                """单个文件检测完成（按完成顺序调用）"""
+                nonlocal completed, last_percent
+                completed += 1
                 
-                detected_info = self.detector.detect_video(
-                    info.filepath,
-                    callback=self.log_message
-                )
+                # 更新状态和进度条（进度条只在整数百分比变化时更新）
+                name = self.video_info_list[i].filename
+                self._post_ui("status", f"已检测 ({completed}/{total_files}): {name}")
+                percent = completed * 100 // total_files
+                if percent != last_percent:
+                    last_percent = percent
+                    self._post_ui("progress", percent)
                 
                 if detected_info:
                     # 更新信息
-                    self.video_info_list[i] = detected_info
-                    
-                    # 更新UI
-                    self.master.after(0, lambda idx=i: self._update_file_list_item(idx))
+                    self._replace_info(i, detected_info)
                     
                     # 如果是当前选中项，更新详情
-                    if i == self.selected_video_index:
-                        self.master.after(0, lambda info=detected_info: self._show_details(info))
+                    self._post_ui("details", i)
+                else:
+                    self._set_status(i, VideoInfo.STATUS_ERROR)
+                
+                # 更新UI
+                self._post_ui("row", i)
+            
+            # 并行检测，日志通过log_queue交给主线程显示
+            self.detector.detect_videos_batch(
+                [info.filepath for info in self.video_info_list],
+                callback=self.log_message,
+                on_result=on_result
+            )
             
             # 检测完成，更新状态
             self.log_message("所有文件检测完成")
-            self.master.after(0, lambda: self.status_var.set("检测完成"))
-            self.master.after(0, lambda: self.progress_var.set(100))
+            self._post_ui("status", "检测完成")
+            self._post_ui("progress", 100)
             
             # 统计结果
             ok_count = sum(1 for info in self.video_info_list if info.status == VideoInfo.STATUS_OK)
@@ -1279,7 +1986,8 @@ class VideoDetectorApp:
             
             # 提示结果
             if error_count > 0:
-                self.master.after(0, lambda: messagebox.showinfo(
+                self._post_ui("call", functools.partial(
+                    messagebox.showinfo,
                     "检测完成", 
                     f"检测完成！\n\n"
                     f"总计: {total_files} 个文件\n"
@@ -1288,24 +1996,27 @@ class VideoDetectorApp:
                     f"可以选择错误文件并点击'修复所选'按钮进行修复。"
                 ))
             else:
-                self.master.after(0, lambda: messagebox.showinfo(
+                self._post_ui("call", functools.partial(
+                    messagebox.showinfo,
                     "检测完成", 
                     f"检测完成！所有 {total_files} 个文件均正常，可以被MoviePy正确处理。"
                 ))
         
         except Exception as e:
             self.log_message(f"检测过程发生错误: {str(e)}")
-            traceback.print_exc()
+            if self.debug:
+                self.log_message(traceback.format_exc())
             
-            self.master.after(0, lambda: messagebox.showerror(
+            self._post_ui("call", functools.partial(
+                messagebox.showerror,
                 "错误",
                 f"检测过程发生错误: {str(e)}\n请查看日志了解详情。"
             ))
         
         finally:
             # 恢复界面
-            self.master.after(0, lambda: self._set_ui_state(True))
-            self.master.after(0, self._update_buttons)
+            self._post_ui("call", functools.partial(self._set_ui_state, True))
+            self._post_ui("call", self._update_buttons)
     
     def _fix_selected(self):
         """修复选中的视频"""
@@ -1322,29 +2033,18 @@ class VideoDetectorApp:
         keep_original_name = self.keep_original_name_var.get()
         delete_original = self.delete_original_var.get() and not keep_original_name
         
-        if keep_original_name:
-            # 直接替换原文件（使用原文件名）
-            output_path = None  # 让修复函数自己处理临时文件和替换
-        else:
-            # 使用添加后缀的文件名
-            dirname = os.path.dirname(info.filepath)
-            basename = os.path.basename(info.filepath)
-            name, ext = os.path.splitext(basename)
-            output_path = os.path.join(dirname, f"{name}_fixed.mp4")
+        output_path = self._derive_output_path(info, keep_original_name)
         
-        # 获取质量设置
+        # 获取质量和验证设置
         quality = self.quality_var.get()
+        verify = self.verify_after_fix_var.get()
         
         # 确认修复
-        message = f"是否修复文件 '{info.filename}'?\n\n"
-        if keep_original_name:
-            message += "将直接替换原文件 (保持原文件名)\n"
-        else:
-            message += f"输出文件将保存为新文件: {os.path.basename(output_path)}\n"
-            if delete_original:
-                message += "修复后将删除原文件\n"
-        message += f"转换质量: {quality}\n"
-        message += "注意: 修复将使用两阶段完全重编码方式，可能需要较长时间"
+        message = self._fix_confirm_message(
+            f"是否修复文件 '{info.filename}'?",
+            f"输出文件将保存为新文件: {os.path.basename(output_path or '')}",
+            keep_original_name, delete_original, quality
+        )
         
         confirm = messagebox.askyesno("确认", message)
         
@@ -1357,7 +2057,7 @@ class VideoDetectorApp:
         # 启动修复线程
         fix_thread = threading.Thread(
             target=self._fix_worker,
-            args=(self.selected_video_index, output_path, quality, delete_original),
+            args=(self.selected_video_index, output_path, quality, delete_original, verify),
             daemon=True
         )
         fix_thread.start()
@@ -1376,19 +2076,16 @@ class VideoDetectorApp:
         keep_original_name = self.keep_original_name_var.get()
         delete_original = self.delete_original_var.get() and not keep_original_name
         
-        # 获取质量设置
+        # 获取质量和验证设置
         quality = self.quality_var.get()
+        verify = self.verify_after_fix_var.get()
         
         # 确认修复
-        message = f"是否修复所有 {len(error_indices)} 个错误视频?\n\n"
-        if keep_original_name:
-            message += "将直接替换原文件 (保持原文件名)\n"
-        else:
-            message += f"输出文件将保存为新文件 (添加'_fixed'后缀)\n"
-            if delete_original:
-                message += "修复后将删除原文件\n"
-        message += f"转换质量: {quality}\n"
-        message += "注意: 修复将使用两阶段完全重编码方式，可能需要较长时间"
+        message = self._fix_confirm_message(
+            f"是否修复所有 {len(error_indices)} 个错误视频?",
+            "输出文件将保存为新文件 (添加'_fixed'后缀)",
+            keep_original_name, delete_original, quality
+        )
         
         confirm = messagebox.askyesno("确认", message)
         
@@ -1401,12 +2098,59 @@ class VideoDetectorApp:
         # 启动批量修复线程
         fix_thread = threading.Thread(
             target=self._batch_fix_worker,
-            args=(error_indices, quality, delete_original, keep_original_name),
+            args=(error_indices, quality, delete_original, keep_original_name, verify),
             daemon=True
         )
         fix_thread.start()
     
-    def _fix_worker(self, index, output_path, quality, delete_original):
+    @staticmethod
+    def _derive_output_path(info, keep_original_name, taken=None):
+        """
+        确定修复输出路径
+        
+        Args:
+            info: VideoInfo对象
+            keep_original_name: 是否保持原文件名（直接替换原文件）
+            taken: 可选，本批次已分配的输出路径集合（规范路径），重名时追加序号并把结果加入集合
+                （追加序号的路径只对本批次有效，不保存在VideoInfo上）
+            
+        Returns:
+            str: 添加'_fixed'后缀的输出路径，保持原文件名时返回None（由修复函数处理临时文件和替换）
+        """
+        if keep_original_name:
+            return None
+        
+        # 添加后缀的基本文件名只生成一次，保存在VideoInfo上
+        if info.suffixed_output_path is None:
+            dirname, basename = os.path.split(info.filepath)
+            name, ext = os.path.splitext(basename)
+            info.suffixed_output_path = os.path.join(dirname, f"{name}_fixed.mp4")
+        
+        # 同目录下仅扩展名不同的文件（如clip.avi和clip.mkv）会得到相同的输出路径，并行修复时互相覆盖
+        output_path = info.suffixed_output_path
+        if taken is not None:
+            counter = 0
+            while _canonical_path(output_path) in taken:
+                counter += 1
+                output_path = f"{os.path.splitext(info.filepath)[0]}_fixed_{counter}.mp4"
+            taken.add(_canonical_path(output_path))
+        return output_path
+    
+    @staticmethod
+    def _fix_confirm_message(question, new_file_line, keep_original_name, delete_original, quality):
+        """生成修复确认对话框的文本"""
+        message = f"{question}\n\n"
+        if keep_original_name:
+            message += "将直接替换原文件 (保持原文件名)\n"
+        else:
+            message += f"{new_file_line}\n"
+            if delete_original:
+                message += "修复后将删除原文件\n"
+        message += f"转换质量: {quality}\n"
+        message += "注意: 修复将完全重新编码视频，可能需要较长时间"
+        return message
+    
+    def _fix_worker(self, index, output_path, quality, delete_original, verify=False):
         """修复工作线程"""
         try:
             if index < 0 or index >= len(self.video_info_list):
@@ -1415,12 +2159,12 @@ class VideoDetectorApp:
             info = self.video_info_list[index]
             
             # 更新状态
-            self.master.after(0, lambda: self.status_var.set(f"正在修复: {info.filename}"))
+            self._post_ui("status", f"正在修复: {info.filename}")
             self.log_message(f"开始修复: {info.filename}")
             
             # 设置状态为处理中
-            info.status = VideoInfo.STATUS_PROCESSING
-            self.master.after(0, lambda idx=index: self._update_file_list_item(idx))
+            self._set_status(index, VideoInfo.STATUS_PROCESSING)
+            self._post_ui("row_status", index)
             
             # 修复视频
             success, message = self.detector.fix_video(
@@ -1428,18 +2172,18 @@ class VideoDetectorApp:
                 output_path=output_path,
                 quality=quality,
                 delete_original=delete_original,
-                callback=self.log_message
+                callback=self.log_message,
+                verify=verify
             )
             
             if success:
                 self.log_message(f"修复成功: {os.path.basename(output_path or info.filepath)}")
                 
                 # 更新UI
-                self.master.after(0, lambda idx=index: self._update_file_list_item(idx))
+                self._post_ui("row", index)
                 
                 # 如果是当前选中项，更新详情
-                if index == self.selected_video_index:
-                    self.master.after(0, lambda info=info: self._show_details(info))
+                self._post_ui("details", index)
                 
                 # 提示成功
                 if output_path:
@@ -1451,16 +2195,17 @@ class VideoDetectorApp:
                     success_msg = f"文件 '{info.filename}' 修复成功！\n\n" \
                                   f"已直接替换原文件。"
                 
-                self.master.after(0, lambda: messagebox.showinfo("修复成功", success_msg))
+                self._post_ui("call", functools.partial(messagebox.showinfo, "修复成功", success_msg))
             else:
                 # 还原状态
-                info.status = VideoInfo.STATUS_ERROR
-                self.master.after(0, lambda idx=index: self._update_file_list_item(idx))
+                self._set_status(index, VideoInfo.STATUS_ERROR)
+                self._post_ui("row_status", index)
                 
                 self.log_message(f"修复失败: {message}")
                 
                 # 提示失败
-                self.master.after(0, lambda: messagebox.showerror(
+                self._post_ui("call", functools.partial(
+                    messagebox.showerror,
                     "修复失败", 
                     f"文件 '{info.filename}' 修复失败！\n\n"
                     f"错误信息: {message}\n\n"
@@ -1469,85 +2214,84 @@ class VideoDetectorApp:
         
         except Exception as e:
             self.log_message(f"修复过程发生错误: {str(e)}")
-            traceback.print_exc()
+            if self.debug:
+                self.log_message(traceback.format_exc())
             
-            self.master.after(0, lambda: messagebox.showerror(
+            self._post_ui("call", functools.partial(
+                messagebox.showerror,
                 "错误",
                 f"修复过程发生错误: {str(e)}\n请查看日志了解详情。"
             ))
         
         finally:
             # 恢复界面
-            self.master.after(0, lambda: self._set_ui_state(True))
-            self.master.after(0, self._update_buttons)
-            self.master.after(0, lambda: self.status_var.set("就绪"))
+            self._post_ui("call", functools.partial(self._set_ui_state, True))
+            self._post_ui("call", self._update_buttons)
+            self._post_ui("status", "就绪")
     
-    def _batch_fix_worker(self, indices, quality, delete_original, keep_original_name=False):
+    def _batch_fix_worker(self, indices, quality, delete_original, keep_original_name=False, verify=False):
         """批量修复工作线程"""
         try:
             total = len(indices)
             self.log_message(f"开始批量修复 {total} 个文件")
-            self.master.after(0, lambda: self.status_var.set(f"批量修复: 0/{total}"))
-            self.master.after(0, lambda: self.progress_var.set(0))
+            self._post_ui("status", f"批量修复: 0/{total}")
+            self._post_ui("progress", 0)
+            
+            # 构建修复任务并设置状态为处理中
+            indices = [index for index in indices if 0 <= index < len(self.video_info_list)]
+            jobs = []
+            taken = set()
+            for index in indices:
+                info = self.video_info_list[index]
+                jobs.append((info, self._derive_output_path(info, keep_original_name, taken)))
+                
+                self._set_status(index, VideoInfo.STATUS_PROCESSING)
+                self._post_ui("row_status", index)
             
             success_count = 0
             fail_count = 0
+            last_percent = 0
             
-            for i, index in enumerate(indices):
-                if index < 0 or index >= len(self.video_info_list):
-                    continue
-                
-                info = self.video_info_list[index]
-                
-                # 更新状态
-                self.master.after(0, lambda i=i, total=total, name=info.filename: 
-                               self.status_var.set(f"批量修复: {i+1}/{total} - {name}"))
-                
-                # 更新进度条
-                progress = (i / total) * 100
-                self.master.after(0, lambda p=progress: self.progress_var.set(p))
-                
-                self.log_message(f"修复 ({i+1}/{total}): {info.filename}")
-                
-                # 设置状态为处理中
-                info.status = VideoInfo.STATUS_PROCESSING
-                self.master.after(0, lambda idx=index: self._update_file_list_item(idx))
-                
-                # 根据保持原文件名选项确定输出路径
-                if keep_original_name:
-                    output_path = None  # 直接替换原文件
-                else:
-                    # 使用添加后缀的文件名
-                    dirname = os.path.dirname(info.filepath)
-                    basename = os.path.basename(info.filepath)
-                    name, ext = os.path.splitext(basename)
-                    output_path = os.path.join(dirname, f"{name}_fixed.mp4")
-                
-                # 修复视频
-                success, message = self.detector.fix_video(
-                    info,
-                    output_path=output_path,
-                    quality=quality,
-                    delete_original=delete_original,
-                    callback=self.log_message
-                )
+            def on_result(i, success, message):
+                """单个文件修复完成（按完成顺序调用）"""
+                nonlocal success_count, fail_count, last_percent
+                index = indices[i]
+                info, output_path = jobs[i]
                 
                 if success:
                     self.log_message(f"  成功: {os.path.basename(output_path or info.filepath)}")
                     success_count += 1
                 else:
                     # 还原状态
-                    info.status = VideoInfo.STATUS_ERROR
-                    self.log_message(f"  失败: {message}")
+                    self._set_status(index, VideoInfo.STATUS_ERROR)
+                    self.log_message(f"  失败: {info.filename} - {message}")
                     fail_count += 1
                 
-                # 更新UI
-                self.master.after(0, lambda idx=index: self._update_file_list_item(idx))
+                # 更新状态和进度条（进度条只在整数百分比变化时更新）
+                done = success_count + fail_count
+                self._post_ui("status", f"批量修复: {done}/{total} - {info.filename}")
+                percent = done * 100 // total
+                if percent != last_percent:
+                    last_percent = percent
+                    self._post_ui("progress", percent)
+                
+                # 更新UI（修复失败时只有状态变化）
+                self._post_ui("row" if success else "row_status", index)
+            
+            # 并行修复，日志通过log_queue交给主线程显示
+            self.detector.fix_videos_batch(
+                jobs,
+                quality=quality,
+                delete_original=delete_original,
+                callback=self.log_message,
+                on_result=on_result,
+                verify=verify
+            )
             
             # 完成后更新状态
             self.log_message(f"批量修复完成: {success_count} 成功, {fail_count} 失败")
-            self.master.after(0, lambda: self.status_var.set("批量修复完成"))
-            self.master.after(0, lambda: self.progress_var.set(100))
+            self._post_ui("status", "批量修复完成")
+            self._post_ui("progress", 100)
             
             # 提示结果
             if keep_original_name:
@@ -1564,21 +2308,23 @@ class VideoDetectorApp:
                 if delete_original and success_count > 0:
                     message += f"\n\n已删除 {success_count} 个原文件"
                 
-            self.master.after(0, lambda: messagebox.showinfo("批量修复完成", message))
+            self._post_ui("call", functools.partial(messagebox.showinfo, "批量修复完成", message))
         
         except Exception as e:
             self.log_message(f"批量修复过程发生错误: {str(e)}")
-            traceback.print_exc()
+            if self.debug:
+                self.log_message(traceback.format_exc())
             
-            self.master.after(0, lambda: messagebox.showerror(
+            self._post_ui("call", functools.partial(
+                messagebox.showerror,
                 "错误",
                 f"批量修复过程发生错误: {str(e)}\n请查看日志了解详情。"
             ))
         
         finally:
             # 恢复界面
-            self.master.after(0, lambda: self._set_ui_state(True))
-            self.master.after(0, self._update_buttons)
+            self._post_ui("call", functools.partial(self._set_ui_state, True))
+            self._post_ui("call", self._update_buttons)
     
     def _set_ui_state(self, enabled):
         """设置UI状态"""
@@ -1589,8 +2335,10 @@ class VideoDetectorApp:
         self.folder_btn.config(state=state)
         self.start_btn.config(state=state)
         self.clear_btn.config(state=state)
+        self.clear_cache_btn.config(state=state)
         self.delete_checkbox.config(state=state if not self.keep_original_name_var.get() else tk.DISABLED)
         self.keep_name_checkbox.config(state=state)
+        self.verify_checkbox.config(state=state)
         
         # 修复按钮状态由_update_buttons控制
         if enabled: